@@ -0,0 +1,245 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+# Default timeout per stage in seconds, override with TIMEOUT_<STAGE> (e.g. TIMEOUT_FETCH=20)
+STAGE_TIMEOUTS = {
+    "connect": 5,  # TCP connect for page downloads
+    "fetch": 30,  # Whole page download including the body
+    "translate": 15,  # One remote translation call
+    "page_load": 30,  # Selenium page load
+    "browser_wait": 10,  # Waiting for an element after a page load or form submit
+    "cookie_wait": 3,  # Waiting for the cookie consent dialog
+}
+
+# Default time budget per hotel, override with HOTEL_BUDGET_SECONDS / RETRY_BUDGET_SECONDS
+HOTEL_BUDGET_SECONDS = 120
+RETRY_BUDGET_SECONDS = 300
+
+# Hedging: a duplicate request is sent once a call is slower than this percentile of recent calls
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20  # Don't hedge until the percentile means something
+LATENCY_WINDOW = 500
+HEDGE_WORKERS = 32
+MAX_ABANDONED_CALLS = 8  # Stop hedging while this many timed-out calls still hold pool threads
+
+stats = Counter()
+
+_executor = None
+_executor_lock = threading.Lock()
+_budget = threading.local()
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+# A hotel that ran out of time; process_with_budget retries it after the others with a larger budget
+class Deferred(Exception):
+    pass
+
+
+class BudgetExceeded(Deferred):
+    pass
+
+
+class StageTimeout(Deferred):
+    pass
+
+
+# Recent latencies of one stage
+class LatencyTracker:
+    def __init__(self, size=LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+latencies = defaultdict(LatencyTracker)
+
+
+# Function to check whether hedged duplicate requests are enabled (HEDGE_REQUESTS=0 turns them off)
+def hedging_enabled():
+    return os.getenv("HEDGE_REQUESTS", "1") != "0"
+
+
+# Function to get the seconds left in the current hotel's budget (None outside a budget)
+def remaining():
+    deadline = getattr(_budget, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+# Function to get the per-hotel time budget for a first attempt or a retry
+def budget_seconds(retry=False):
+    if retry:
+        return float(os.getenv("RETRY_BUDGET_SECONDS", RETRY_BUDGET_SECONDS))
+    return float(os.getenv("HOTEL_BUDGET_SECONDS", HOTEL_BUDGET_SECONDS))
+
+
+# Function to get a stage's configured timeout
+def configured_timeout(stage):
+    return float(os.getenv(f"TIMEOUT_{stage.upper()}", STAGE_TIMEOUTS[stage]))
+
+
+# Function to get a stage's timeout, cut short by the hotel budget
+def stage_timeout(stage):
+    timeout = configured_timeout(stage)
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise BudgetExceeded(f"Hotel time budget used up before {stage}")
+    return min(timeout, left)
+
+
+@contextmanager
+def hotel_budget(seconds=None):
+    seconds = seconds or budget_seconds()
+    previous = getattr(_budget, "deadline", None)
+    _budget.deadline = time.monotonic() + seconds
+    try:
+        yield
+    finally:
+        _budget.deadline = previous
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+    return _executor
+
+
+# Function to count timed-out calls that are still running in the pool
+def abandoned_calls():
+    with _abandoned_lock:
+        return _abandoned
+
+
+def _abandon(futures):
+    global _abandoned
+    for future in futures:
+        if future.cancel():
+            continue  # Still queued, never started
+        with _abandoned_lock:
+            _abandoned += 1
+        future.add_done_callback(_release)
+
+
+def _release(future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+# Function to run an idempotent call with the stage timeout, sending one hedged duplicate if it runs past p95
+def call(stage, fn, *args, hedge=True):
+    timeout = stage_timeout(stage)
+    tracker = latencies[stage]
+    hedge_after = None
+    if hedge and hedging_enabled() and len(tracker) >= HEDGE_MIN_SAMPLES:
+        if abandoned_calls() < MAX_ABANDONED_CALLS:
+            hedge_after = tracker.percentile(HEDGE_PERCENTILE)
+        else:
+            stats[f"{stage}_hedges_skipped"] += 1
+
+    executor = _get_executor()
+    start = time.monotonic()
+    deadline = start + timeout
+    pending = {executor.submit(fn, *args)}
+    hedged = False
+    error = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        wait_for = deadline - now
+        if not hedged and hedge_after is not None:
+            wait_for = min(wait_for, max(0, start + hedge_after - now))
+
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                tracker.record(time.monotonic() - start)
+                return future.result()
+            error = future.exception()
+
+        # Errors are not hedged; only a slow first call gets a duplicate
+        if pending and not hedged and hedge_after is not None and time.monotonic() >= start + hedge_after:
+            pending.add(executor.submit(fn, *args))
+            hedged = True
+            stats[f"{stage}_hedges"] += 1
+
+    if error is not None and not pending:
+        raise error
+
+    # Calls still running are abandoned and end on their own socket timeouts; until then they hold pool threads
+    _abandon(pending)
+    tracker.record(timeout)
+    stats[f"{stage}_timeouts"] += 1
+    left = remaining()
+    if left is not None and left <= 0:
+        raise BudgetExceeded(f"Hotel time budget used up during {stage}")
+    raise StageTimeout(f"{stage} took longer than {timeout:.1f}s")
+
+
+# Function to process hotels one by one within a time budget each, then retry deferred hotels with a larger budget
+def process_with_budget(hotels, process_hotel):
+    budget = budget_seconds()
+    retry_budget = budget_seconds(retry=True)
+    hotel_latencies = {}  # One total per hotel, including its retry pass
+    deferred = []
+    failed = []
+
+    for retry, (names, seconds) in enumerate([(hotels, budget), (deferred, retry_budget)]):
+        if retry and deferred:
+            logging.info(f"Retry pass for {len(deferred)} deferred hotel(s) with a {seconds:.0f}s budget")
+        for hotel_name in list(names):
+            start = time.monotonic()
+            try:
+                with hotel_budget(seconds):
+                    process_hotel(hotel_name)
+            except Deferred as e:
+                if not retry:
+                    logging.warning(f"Deferring '{hotel_name}' to the retry pass: {e}")
+                    deferred.append(hotel_name)
+                else:
+                    logging.error(f"Giving up on '{hotel_name}' after the retry pass: {e}")
+                    failed.append(hotel_name)
+            hotel_latencies[hotel_name] = hotel_latencies.get(hotel_name, 0) + time.monotonic() - start
+
+    logging.info(f"Per-hotel latency: {latency_summary(list(hotel_latencies.values()))}, deferred: {len(deferred)}, over budget: {len(failed)}")
+    if stats:
+        logging.info(f"Hedges and timeouts: {dict(stats)}")
+    return failed
+
+
+# Function to format p50/p95/p99 of a list of latencies
+def latency_summary(values):
+    if not values:
+        return "no hotels"
+    values = sorted(values)
+
+    def pct(p):
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    return f"p50 {pct(50):.1f}s, p95 {pct(95):.1f}s, p99 {pct(99):.1f}s, max {values[-1]:.1f}s"
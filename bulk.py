@@ -1,57 +1,34 @@
-import os
 import logging
-import requests
-from bs4 import BeautifulSoup
-from pymongo import MongoClient, errors  # Ensure pymongo is imported
-from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
-from datetime import datetime, timezone
 import json
+from datetime import datetime, timezone
 
-# Load environment variables
-load_dotenv()
+import db
+import translation
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# MongoDB setup
-mongo_uri = os.getenv("MONGO_URI")
-if not mongo_uri:
-    raise ValueError("MongoDB URI not found in environment variables! Please check your .env file.")
-
-try:
-    client = MongoClient(mongo_uri)
-    db = client["hotel_data"]  # Database name
-    collection = db["hotels_eng"]  # Collection name
-
-    # Create a compound index on "hotel_url" and "version" for efficient duplicate tracking
-    collection.create_index([("hotel_url", 1), ("version", 1)], unique=True)
-    logging.info("Successfully connected to MongoDB and ensured compound index on hotel_url and version.")
-except Exception as e:
-    logging.error(f"Failed to connect to MongoDB: {e}")
-    exit(1)
+# MongoDB collection, connected on first use
+def get_collection():
+    return db.get_collection("hotels_eng", [("hotel_url", 1), ("version", 1)])
 
 # Base URL
 base_url = "https://www.golf-extra.com"
 
 # Function to translate text from German to English
 def translate_to_english(text):
-    try:
-        if not text.strip():  # Skip empty strings
-            return text
-        # Translate only the first 500 characters to avoid issues with large chunks
-        return GoogleTranslator(source='de', target='en').translate(text.strip()[:500])  
-    except Exception as e:
-        logging.warning(f"Translation failed for text: {text[:100]}... | Error: {e}")
-        return text  # Return original text if translation fails
+    # Headings and boilerplate lines come from the glossary or cache; translate only the first 500 characters
+    return translation.translate_lines(text, max_chars=500)
 
 # Step 1: Search for the hotel and get the hotel page URL
 def search_hotel(base_url, hotel_name):
+    import requests
+    from bs4 import BeautifulSoup
+    from fetching import fetch_html
+
     search_url = f"{base_url}/suche?tx_solr%5Bq%5D={hotel_name.replace(' ', '+')}"
     try:
-        response = requests.get(search_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(fetch_html(search_url), 'html.parser')
 
         # Find the specific hotel link
         hotel_link = None
@@ -73,10 +50,13 @@ def search_hotel(base_url, hotel_name):
 
 # Step 2: Scrape data from the hotel page, clean, translate to English, and save to MongoDB
 def scrape_and_save_to_mongodb(hotel_url, selectors):
+    import requests
+    from bs4 import BeautifulSoup
+    from pymongo import errors
+    from fetching import fetch_html
+
     try:
-        response = requests.get(hotel_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(fetch_html(hotel_url), 'html.parser')
 
         # Extract data
         extracted_data = {}
@@ -89,6 +69,7 @@ def scrape_and_save_to_mongodb(hotel_url, selectors):
 
         if extracted_data:
             # Get the current version for the hotel_url
+            collection = get_collection()
             version = collection.count_documents({"hotel_url": hotel_url}) + 1
             document = {
                 "hotel_url": hotel_url,
@@ -98,9 +79,11 @@ def scrape_and_save_to_mongodb(hotel_url, selectors):
             }
             try:
                 # Attempt to insert the document
+                document["seq"] = db.next_sequence(collection.name)
                 collection.insert_one(document)
                 logging.info(f"Translated and cleaned data successfully saved to MongoDB for URL: {hotel_url}, version: {version}")
             except errors.DuplicateKeyError:
+                db.abandon_sequence(collection.name, document["seq"])
                 logging.warning(f"Duplicate key error for hotel_url: {hotel_url}. Retrying with a new version.")
         else:
             logging.warning(f"No data extracted from the page: {hotel_url}")
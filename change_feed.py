@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+
+import db
+
+# Collections in the feed and the field each one tracks versions by
+FEED_COLLECTIONS = {
+    "hotels_golf_extra": "hotel_url",
+    "hotels_golf-motion": "hotel_url",
+    "hotels_classic_golf": "hotel_name",
+    "hotels_eng": "hotel_url",
+}
+
+# Default export settings
+BATCH_SIZE = 5000
+SETTLE_SECONDS = 300  # How long a gap in seq may stay open, by the database clock, before it is treated as a failed insert
+GAP_POLL_SECONDS = 5  # How often an export re-checks a gap it is waiting on
+FORMATS = ["ndjson", "parquet"]
+
+# Fields compared when diffing two versions of a hotel
+CONTENT_FIELDS = ["hotel_name", "hotel_url", "data", "table_data"]
+
+
+# Function to get the checkpoint collection
+def get_checkpoints():
+    return db.get_db()["feed_checkpoints"]
+
+
+# Function to index seq and number any documents written before seq existed, oldest first
+def prepare_collection(collection):
+    from pymongo import ASCENDING
+
+    collection.create_index([("seq", ASCENDING)])
+
+    missing = collection.count_documents({"seq": {"$exists": False}})
+    if not missing:
+        return 0
+
+    # Reserve a block of sequence numbers and hand them out in timestamp order
+    last = db.next_sequence(collection.name, count=missing)
+    seq = last - missing
+    numbered = 0
+    for document in collection.find({"seq": {"$exists": False}}, {"_id": 1}).sort([("timestamp", ASCENDING), ("_id", ASCENDING)]):
+        if seq >= last:
+            break  # Documents inserted by old code since counting; picked up next run
+        seq += 1
+        collection.update_one({"_id": document["_id"], "seq": {"$exists": False}}, {"$set": {"seq": seq}})
+        numbered += 1
+    logging.info(f"Assigned seq to {numbered} existing document(s) in {collection.name}")
+    return numbered
+
+
+# Function to read where a consumer's last export of a collection stopped
+def read_checkpoint(checkpoints, consumer, collection_name):
+    checkpoint = checkpoints.find_one({"_id": f"{consumer}:{collection_name}"})
+    return checkpoint.get("seq", 0) if checkpoint else 0
+
+
+# Function to move a checkpoint forward, only if no other export moved it first
+def advance_checkpoint(checkpoints, consumer, collection_name, old_seq, new_seq, batch_file):
+    from pymongo import errors
+
+    checkpoint_id = f"{consumer}:{collection_name}"
+    update = {"$set": {"seq": new_seq, "batch_file": batch_file, "updated_at": datetime.now(timezone.utc)}}
+    if old_seq == 0:
+        try:
+            result = checkpoints.update_one({"_id": checkpoint_id, "seq": {"$in": [0, None]}}, update, upsert=True)
+            return result.modified_count == 1 or result.upserted_id is not None
+        except errors.DuplicateKeyError:
+            return False  # Another export created the checkpoint in the meantime
+    result = checkpoints.update_one({"_id": checkpoint_id, "seq": old_seq}, update)
+    return result.modified_count == 1
+
+
+# Function to get the seqs from from_seq on whose inserts failed (recorded by db.abandon_sequence)
+def abandoned_sequences(collection_name, from_seq):
+    gaps = db.get_db()["feed_gaps"].find({"collection": collection_name, "seq": {"$gte": from_seq}}, {"seq": 1})
+    return {gap["seq"] for gap in gaps}
+
+
+# Function to check whether a gap in seq has stayed open for settle_seconds since this consumer first saw it
+def gap_settled(checkpoints, consumer, collection_name, gap_seq, settle_seconds):
+    from pymongo import ReturnDocument
+
+    # Both times come from the database server ($$NOW), so worker and exporter clocks don't matter
+    checkpoint = checkpoints.find_one_and_update(
+        {"_id": f"{consumer}:{collection_name}"},
+        [{"$set": {
+            "gap_first_seen": {"$cond": [{"$eq": ["$gap_seq", gap_seq]}, "$gap_first_seen", "$$NOW"]},
+            "gap_seq": gap_seq,
+            "gap_checked_at": "$$NOW",
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return (checkpoint["gap_checked_at"] - checkpoint["gap_first_seen"]).total_seconds() >= settle_seconds
+
+
+# Function to compare two versions field by field; returns {path: {"old": ..., "new": ...}}
+def diff_documents(old, new, path=""):
+    changes = {}
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(set(old) | set(new), key=str):
+            changes.update(diff_documents(old.get(key), new.get(key), f"{path}.{key}" if path else str(key)))
+    elif isinstance(old, list) and isinstance(new, list):
+        for idx in range(max(len(old), len(new))):
+            old_item = old[idx] if idx < len(old) else None
+            new_item = new[idx] if idx < len(new) else None
+            changes.update(diff_documents(old_item, new_item, f"{path}.{idx}"))
+    elif old != new:
+        changes[path] = {"old": old, "new": new}
+    return changes
+
+
+# Function to read the next batch of documents after a seq; returns (batch, first missing seq it stopped at or None)
+# Missing seqs in abandoned are skipped, and so is the rest of a gap starting at settled_gap
+def read_batch(collection, after_seq, batch_size, abandoned=(), settled_gap=None):
+    batch = []
+    expected = after_seq + 1
+    for document in collection.find({"seq": {"$gt": after_seq}}).sort("seq", 1).limit(batch_size):
+        # An earlier seq may still be being inserted by another worker
+        missing = next((seq for seq in range(expected, document["seq"]) if seq not in abandoned), None)
+        if missing is not None and missing != settled_gap:
+            return batch, missing
+        batch.append(document)
+        expected = document["seq"] + 1
+    return batch, None
+
+
+# Function to build the feed records for a batch, optionally with diffs against the previous version
+def build_records(collection, key_field, batch, include_diffs):
+    records = []
+    previous_versions = {}
+    for document in batch:
+        record = {
+            "collection": collection.name,
+            "key": document.get(key_field),
+            "seq": document["seq"],
+            "version": document.get("version"),
+            "timestamp": document.get("timestamp"),
+            "document": document,
+        }
+        if include_diffs:
+            key = document.get(key_field)
+            previous = previous_versions.get(key)
+            if previous is None and document.get("version", 1) > 1:
+                previous = collection.find_one({key_field: key, "version": document["version"] - 1})
+            new_content = {field: document.get(field) for field in CONTENT_FIELDS if field in document}
+            if previous is None:
+                record["diff"] = None  # First version
+            else:
+                old_content = {field: previous.get(field) for field in CONTENT_FIELDS if field in previous}
+                record["diff"] = diff_documents(old_content, new_content)
+            previous_versions[key] = document
+        records.append(record)
+    return records
+
+
+# Function to write a batch to a temporary file and move it into place in one step
+def write_batch(records, path, output_format):
+    from bson import json_util
+
+    temp_path = f"{path}.tmp"
+    if output_format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow).")
+
+        # Nested documents and diffs are stored as JSON strings
+        columns = {
+            "collection": [r["collection"] for r in records],
+            "key": [r["key"] for r in records],
+            "seq": [r["seq"] for r in records],
+            "version": [r["version"] for r in records],
+            "timestamp": [r["timestamp"] for r in records],
+            "document": [json_util.dumps(r["document"], json_options=json_util.RELAXED_JSON_OPTIONS) for r in records],
+        }
+        if records and "diff" in records[0]:
+            columns["diff"] = [json_util.dumps(r["diff"], json_options=json_util.RELAXED_JSON_OPTIONS) for r in records]
+        pq.write_table(pa.table(columns), temp_path)
+    else:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json_util.dumps(record, json_options=json_util.RELAXED_JSON_OPTIONS, ensure_ascii=False))
+                f.write("\n")
+
+    os.replace(temp_path, path)
+
+
+# Function to export everything written to a collection since the consumer's checkpoint
+def export_collection(collection_name, output_dir, consumer="warehouse", output_format="ndjson",
+                      include_diffs=False, batch_size=BATCH_SIZE, settle_seconds=SETTLE_SECONDS, wait_for_gaps=True):
+    collection = db.get_db()[collection_name]
+    key_field = FEED_COLLECTIONS[collection_name]
+    checkpoints = get_checkpoints()
+    prepare_collection(collection)
+
+    collection_dir = os.path.join(output_dir, collection_name)
+    os.makedirs(collection_dir, exist_ok=True)
+
+    exported = 0
+    last_seq = read_checkpoint(checkpoints, consumer, collection_name)
+    abandoned = abandoned_sequences(collection_name, last_seq + 1)
+    settled_gap = None
+    waiting_for = None
+    while True:
+        batch, gap = read_batch(collection, last_seq, batch_size, abandoned, settled_gap)
+        if not batch:
+            if gap is None:
+                break
+            abandoned |= abandoned_sequences(collection_name, gap)  # The failed insert may have been recorded since
+            if gap in abandoned:
+                continue
+            if gap_settled(checkpoints, consumer, collection_name, gap, settle_seconds):
+                logging.warning(f"Skipping seq {gap} in {collection_name}; it stayed missing for {settle_seconds}s")
+                settled_gap = gap
+                continue
+
+            # Wait for the insert to land or the gap to settle, at most settle_seconds (plus one poll)
+            if gap != waiting_for:
+                waiting_for, wait_start = gap, time.monotonic()
+            if not wait_for_gaps or time.monotonic() - wait_start > settle_seconds + GAP_POLL_SECONDS:
+                logging.info(f"Stopping at seq {gap} in {collection_name}; the insert may still be in flight")
+                break
+            logging.info(f"Waiting for seq {gap} in {collection_name}; the insert may still be in flight")
+            time.sleep(GAP_POLL_SECONDS)
+            continue
+
+        records = build_records(collection, key_field, batch, include_diffs)
+        new_seq = batch[-1]["seq"]
+        batch_file = os.path.join(collection_dir, f"{last_seq + 1:012d}-{new_seq:012d}.{output_format}")
+        write_batch(records, batch_file, output_format)
+
+        if not advance_checkpoint(checkpoints, consumer, collection_name, last_seq, new_seq, batch_file):
+            os.remove(batch_file)
+            raise RuntimeError(f"Checkpoint for {consumer}:{collection_name} moved during export; another export is running.")
+
+        logging.info(f"Exported {len(batch)} change(s) from {collection_name} to {batch_file}")
+        exported += len(batch)
+        last_seq = new_seq
+
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export new hotel versions since the last sync checkpoint")
+    parser.add_argument("output_dir")
+    parser.add_argument("--collection", action="append", choices=list(FEED_COLLECTIONS))
+    parser.add_argument("--consumer", default="warehouse", help="Each consumer keeps its own checkpoint")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--diffs", action="store_true", help="Include field-level diffs against the previous version")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--settle-seconds", type=int, default=SETTLE_SECONDS)
+    parser.add_argument("--no-wait", action="store_true", help="Stop at an unsettled gap in seq instead of waiting for it")
+    args = parser.parse_args(argv)
+
+    total = 0
+    for collection_name in args.collection or list(FEED_COLLECTIONS):
+        total += export_collection(collection_name, args.output_dir, consumer=args.consumer, output_format=args.format,
+                                   include_diffs=args.diffs, batch_size=args.batch_size, settle_seconds=args.settle_seconds,
+                                   wait_for_gaps=not args.no_wait)
+    logging.info(f"Exported {total} change(s) in total")
+    print(json.dumps({"exported": total}))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    sys.exit(main())
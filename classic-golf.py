@@ -1,80 +1,119 @@
-import time
+import os
 import logging
 import json
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-from pymongo import MongoClient
-from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
-import os
 from datetime import datetime, timezone
 
-# Load environment variables
-load_dotenv()
+import budgets
+import db
+import translation
+from memory import BROWSER_MAX_PAGES, BROWSER_MAX_RSS_MB, env_limit, peak_rss_summary, process_tree_rss_mb
+from records import PriceTable
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# MongoDB setup
-mongo_uri = os.getenv("MONGO_URI")
-if not mongo_uri:
-    raise ValueError("MongoDB URI not found in environment variables! Please check your .env file.")
-
-try:
-    client = MongoClient(mongo_uri)
-    db = client["hotel_data"]  # Database name
-    collection = db["hotels_classic_golf"]  # Collection name
-
-    # Create a compound index on "hotel_name" and "version" for efficient duplicate tracking
-    collection.create_index([("hotel_name", 1), ("version", 1)], unique=True)
-    logging.info("Successfully connected to MongoDB and ensured compound index on hotel_name and version.")
-except Exception as e:
-    logging.error(f"Failed to connect to MongoDB: {e}")
-    exit(1)
-
-# Configure WebDriver Service and Headless Chrome Options
-driver_path = "./chromedriver-win64/chromedriver.exe"  # Path to ChromeDriver
-service = Service(driver_path)
-
-chrome_options = Options()
-chrome_options.add_argument("--headless")  # Enable headless mode
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--window-size=1920,1080")  # Set screen size for better rendering
+# MongoDB collection, connected on first use
+def get_collection():
+    return db.get_collection("hotels_classic_golf", [("hotel_name", 1), ("version", 1)])
+
+# Default path to ChromeDriver, override with CHROMEDRIVER_PATH
+default_driver_path = "./chromedriver-win64/chromedriver.exe"
+
+# Function to start a headless Chrome session (Selenium is only loaded here)
+def create_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from dotenv import load_dotenv
+
+    # Configure WebDriver Service and Headless Chrome Options
+    load_dotenv()
+    service = Service(os.getenv("CHROMEDRIVER_PATH", default_driver_path))
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Enable headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")  # Set screen size for better rendering
+
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+# Page loads per hotel (search results + hotel price page)
+PAGES_PER_HOTEL = 2
+
+# Chrome session that is restarted after a number of pages or once it uses too much memory
+class BrowserSession:
+    def __init__(self, max_pages=None, max_rss_mb=None):
+        self.max_pages = max_pages or env_limit("BROWSER_MAX_PAGES", BROWSER_MAX_PAGES)
+        self.max_rss_mb = max_rss_mb or env_limit("BROWSER_MAX_RSS_MB", BROWSER_MAX_RSS_MB)
+        self.driver = None
+        self.pages = 0
+        self.restarts = 0
+
+    # Function to get the driver for the next hotel, recycling the browser when it hits a limit
+    def get_driver(self):
+        if self.driver is not None:
+            reason = None
+            if self.pages >= self.max_pages:
+                reason = f"{self.pages} pages"
+            else:
+                # Chrome's memory lives in chromedriver's child processes; needs psutil to measure
+                process = getattr(self.driver.service, "process", None)
+                rss = process_tree_rss_mb(process.pid) if process else None
+                if rss is not None and rss >= self.max_rss_mb:
+                    reason = f"{rss:.0f} MB RSS"
+            if reason:
+                logging.info(f"Recycling browser after {reason}.")
+                self.close()
+                self.restarts += 1
+
+        if self.driver is None:
+            self.driver = create_driver()
+            self.pages = 0
+        self.pages += PAGES_PER_HOTEL
+        return self.driver
+
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logging.warning(f"Failed to close browser: {e}")
+            self.driver = None
 
 # Function to translate text
 def translate_text(text):
-    try:
-        return GoogleTranslator(source='de', target='en').translate(text)
-    except Exception as e:
-        logging.warning(f"Translation failed for text: {text}. Error: {e}")
-        return text  # Return original text if translation fails
+    return translation.translate(text)
 
 # Function to search hotel and extract translated table data
 def search_hotel_and_extract_data(hotel_name, driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from bs4 import BeautifulSoup
+
+    from selenium.common.exceptions import TimeoutException
+
     try:
         # Open the search page
         search_url = "https://www.classicgolftours.de/search"
+        driver.set_page_load_timeout(budgets.stage_timeout("page_load"))
         driver.get(search_url)
 
-        # Handle the cookie consent dialog
-        try:
-            cookie_accept_button = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll"))
-            )
-            cookie_accept_button.click()
-            logging.info("Cookie consent dialog closed.")
-        except Exception as e:
-            logging.warning("No cookie consent dialog found or error closing it. Proceeding...")
+        # Handle the cookie consent dialog (only shown until it has been accepted once in this browser)
+        if driver.get_cookie("CookieConsent") is None:
+            try:
+                cookie_accept_button = WebDriverWait(driver, budgets.stage_timeout("cookie_wait")).until(
+                    EC.presence_of_element_located((By.ID, "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll"))
+                )
+                cookie_accept_button.click()
+                logging.info("Cookie consent dialog closed.")
+            except Exception:
+                logging.warning("No cookie consent dialog found or error closing it. Proceeding...")
 
         # Locate the input field and fill in the hotel name
-        email_input = WebDriverWait(driver, 10).until(
+        email_input = WebDriverWait(driver, budgets.stage_timeout("browser_wait")).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "#email"))
         )
         email_input.clear()
@@ -85,48 +124,101 @@ def search_hotel_and_extract_data(hotel_name, driver):
         submit_button.click()
 
         # Wait for results to load
-        time.sleep(5)
+        try:
+            WebDriverWait(driver, budgets.stage_timeout("browser_wait")).until(EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "#region > div:nth-child(1) > div > div > ul > li > a")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "#region")),
+            ))
+        except TimeoutException:
+            logging.warning(f"Search results for '{hotel_name}' did not load in time.")
 
         # Locate the "Hotels" section and get the first result link
         soup = BeautifulSoup(driver.page_source, "html.parser")
-        hotel_links = soup.select("#region > div:nth-child(1) > div > div > ul > li > a")
+        hotel_link = soup.select_one("#region > div:nth-child(1) > div > div > ul > li > a")
+        relative_url = hotel_link["href"] if hotel_link else None
+        soup.decompose()
 
-        if hotel_links:
-            relative_url = hotel_links[0]["href"]
+        if relative_url:
             final_url = f"https://www.classicgolftours.de{relative_url}#preise"
             logging.info(f"Final Hotel URL with #preise for '{hotel_name}': {final_url}")
 
             # Open the final URL to scrape pricing data
+            driver.set_page_load_timeout(budgets.stage_timeout("page_load"))
             driver.get(final_url)
-            time.sleep(5)  # Wait for the page to load
+            try:
+                WebDriverWait(driver, budgets.stage_timeout("browser_wait")).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "#text_preise > div:nth-child(2) > table > tbody"))
+                )
+            except TimeoutException:
+                pass  # Reported below as a missing price table
 
             # Parse the page content
             soup = BeautifulSoup(driver.page_source, "html.parser")
             price_table = soup.select_one("#text_preise > div:nth-child(2) > table > tbody")
 
+            # Extract table data as text, then free the parse tree before the slow translation calls
+            rows = None
             if price_table:
-                # Extract and translate table data as text
-                table_data = []
-                for row in price_table.find_all("tr"):
-                    cells = [translate_text(cell.get_text(strip=True)) for cell in row.find_all(["th", "td"])]
-                    table_data.append(cells)
+                rows = tuple(
+                    tuple(cell.get_text(strip=True) for cell in row.find_all(["th", "td"]))
+                    for row in price_table.find_all("tr")
+                )
+            soup.decompose()
+            del soup, price_table
+
+            if rows is not None:
+                # Translate table data
+                table = PriceTable(hotel_name, final_url, tuple(tuple(translate_text(cell) for cell in cells) for cells in rows))
 
                 logging.info(f"Extracted and translated table data for '{hotel_name}'.")
-                return {
-                    "hotel_name": hotel_name,
-                    "hotel_url": final_url,
-                    "table_data": table_data,
-                    "timestamp": datetime.now(timezone.utc)
-                }
+                return table.to_document(datetime.now(timezone.utc))
             else:
                 logging.warning(f"No price table found for '{hotel_name}' at URL: {final_url}")
         else:
             logging.warning(f"No hotel links found for '{hotel_name}'.")
         return None
+    except budgets.Deferred:
+        raise
+    except TimeoutException as e:
+        # A slow page load or wait defers the hotel to the retry pass instead of dropping it
+        raise budgets.StageTimeout(f"Browser timed out for '{hotel_name}': {e.msg or e}")
     except Exception as e:
+        # A page load or wait that was cut short by the hotel budget defers the hotel instead of failing it
+        left = budgets.remaining()
+        if left is not None and left <= 0:
+            raise budgets.BudgetExceeded(f"Hotel time budget used up: {e}")
         logging.error(f"An error occurred while processing '{hotel_name}': {e}")
         return None
 
+# Function to store extracted data in MongoDB as a new version
+def save_to_mongodb(extracted_data):
+    from pymongo import errors
+
+    hotel_name = extracted_data["hotel_name"]
+    collection = get_collection()
+    version = collection.count_documents({"hotel_name": hotel_name}) + 1
+    extracted_data["version"] = version  # Add version to the document
+    try:
+        extracted_data["seq"] = db.next_sequence(collection.name)
+        collection.insert_one(extracted_data)
+        logging.info(f"Data successfully stored in MongoDB for hotel: {hotel_name}, version: {version}")
+        return version
+    except errors.DuplicateKeyError as e:
+        db.abandon_sequence(collection.name, extracted_data["seq"])
+        logging.warning(f"Failed to store data in MongoDB for hotel: {hotel_name}. Error: {e}")
+        return None
+    except Exception as e:
+        logging.warning(f"Failed to store data in MongoDB for hotel: {hotel_name}. Error: {e}")
+        return None
+
+# Function to scrape and store one hotel
+def process_hotel(hotel_name, browser):
+    logging.info(f"Processing hotel: {hotel_name}")
+    extracted_data = search_hotel_and_extract_data(hotel_name, browser.get_driver())
+    if extracted_data:
+        # Store in MongoDB
+        save_to_mongodb(extracted_data)
+
 # Function to process hotels from JSON file
 def process_hotels_from_json(json_file):
     try:
@@ -134,30 +226,21 @@ def process_hotels_from_json(json_file):
         with open(json_file, "r", encoding="utf-8") as file:
             hotels = json.load(file)
 
-        # Initialize WebDriver with headless mode
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-
-        # Process each hotel
-        for hotel_name in hotels:
-            logging.info(f"Processing hotel: {hotel_name}")
-            extracted_data = search_hotel_and_extract_data(hotel_name, driver)
-            if extracted_data:
-                # Store in MongoDB
-                version = collection.count_documents({"hotel_name": hotel_name}) + 1
-                extracted_data["version"] = version  # Add version to the document
-                try:
-                    collection.insert_one(extracted_data)
-                    logging.info(f"Data successfully stored in MongoDB for hotel: {hotel_name}, version: {version}")
-                except Exception as e:
-                    logging.warning(f"Failed to store data in MongoDB for hotel: {hotel_name}. Error: {e}")
+        # Headless browser, recycled every BROWSER_MAX_PAGES pages or BROWSER_MAX_RSS_MB of memory
+        browser = BrowserSession()
+
+        # Process each hotel within its time budget; hotels that run out are retried after the others
+        budgets.process_with_budget(hotels, lambda hotel_name: process_hotel(hotel_name, browser))
 
         # Close the browser after processing all hotels
-        driver.quit()
+        browser.close()
+        logging.info(f"Processed {len(hotels)} hotel(s), browser restarts: {browser.restarts}, peak RSS: {peak_rss_summary()}")
+        logging.info(f"Translation: {translation.translation_summary()}")
 
     except Exception as e:
         logging.error(f"An error occurred while processing the hotels JSON: {e}")
-        if "driver" in locals():
-            driver.quit()
+        if "browser" in locals():
+            browser.close()
 
 # Main execution
 if __name__ == "__main__":
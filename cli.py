@@ -0,0 +1,143 @@
+import sys
+import json
+import logging
+import argparse
+import importlib
+
+from sites import SITE_SCRIPTS
+
+# Only lightweight modules are imported here; each subcommand loads what it needs
+SITES = list(SITE_SCRIPTS)
+
+
+# Function to run a site's scraper over every hotel in a JSON file
+def crawl(args):
+    from sites import load_site
+
+    module = load_site(args.site)
+    if args.site == "classic-golf":
+        module.process_hotels_from_json(args.json_file)
+    else:
+        module.process_bulk_hotels(args.json_file, module.selectors)
+    return 0
+
+
+# Function to scrape specific hotels again and store a new version for each
+def re_extract(args):
+    from sites import SiteCrawler
+
+    crawler = SiteCrawler()
+    failed = 0
+    try:
+        for hotel_name in args.hotels:
+            try:
+                version = crawler.crawl(args.site, hotel_name)
+                logging.info(f"Re-extracted '{hotel_name}' on {args.site}, version: {version}")
+            except Exception as e:
+                logging.error(f"Re-extraction failed for '{hotel_name}' on {args.site}: {e}")
+                failed += 1
+    finally:
+        crawler.close()
+    return 1 if failed else 0
+
+
+# Function to export the latest version of every hotel (or every version) as a JSON array
+def export(args):
+    from bson import json_util
+    import db
+    from sites import SITE_COLLECTIONS, SITE_KEY_FIELDS
+
+    collection_name = SITE_COLLECTIONS[args.site]
+    collection = db.get_db()[collection_name]
+    if args.all_versions:
+        documents = collection.find().sort([(SITE_KEY_FIELDS[args.site], 1), ("version", 1)])
+    else:
+        documents = collection.aggregate([
+            {"$sort": {"version": -1}},
+            {"$group": {"_id": f"${SITE_KEY_FIELDS[args.site]}", "latest": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$latest"}},
+            {"$sort": {SITE_KEY_FIELDS[args.site]: 1}},
+        ], allowDiskUse=True)
+
+    output = args.output or f"hotel_data.{collection_name}.json"
+    documents = list(documents)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(json_util.dumps(documents, indent=2, ensure_ascii=False))
+    logging.info(f"Exported {len(documents)} document(s) from {collection_name} to {output}")
+    return 0
+
+
+# Function to print document counts per collection and crawl queue counts
+def stats(args):
+    import db
+    from sites import SITE_COLLECTIONS, SITE_KEY_FIELDS
+
+    database = db.get_db()
+    result = {}
+    for site, collection_name in SITE_COLLECTIONS.items():
+        collection = database[collection_name]
+        latest = collection.find_one({}, {"timestamp": 1}, sort=[("timestamp", -1)])
+        result[site] = {
+            "collection": collection_name,
+            "documents": collection.estimated_document_count(),
+            "hotels": len(collection.distinct(SITE_KEY_FIELDS[site])),
+            "last_crawl": latest["timestamp"].isoformat() if latest and latest.get("timestamp") else None,
+        }
+
+    if not args.no_queue:
+        import work_queue
+
+        result["queue"] = work_queue.queue_stats(work_queue.get_jobs_collection())
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+# Subcommands that hand their arguments to another script's main()
+PASSTHROUGH_COMMANDS = {
+    "worker": ("worker", "Distributed crawl queue (see worker.py --help)"),
+    "schedule": ("scheduler", "Plan recrawls (see scheduler.py --help)"),
+    "feed": ("change_feed", "Incremental change export (see change_feed.py --help)"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hotel price scraping tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Scrape every hotel in a JSON file on one site")
+    crawl_parser.add_argument("site", choices=SITES)
+    crawl_parser.add_argument("json_file", nargs="?", default="hotels.json")
+    crawl_parser.set_defaults(handler=crawl)
+
+    re_extract_parser = subparsers.add_parser("re-extract", help="Scrape specific hotels again")
+    re_extract_parser.add_argument("site", choices=SITES)
+    re_extract_parser.add_argument("hotels", nargs="+")
+    re_extract_parser.set_defaults(handler=re_extract)
+
+    export_parser = subparsers.add_parser("export", help="Export a site's collection to JSON")
+    export_parser.add_argument("site", choices=SITES)
+    export_parser.add_argument("--output", help="Defaults to hotel_data.<collection>.json")
+    export_parser.add_argument("--all-versions", action="store_true")
+    export_parser.set_defaults(handler=export)
+
+    stats_parser = subparsers.add_parser("stats", help="Show collection and queue counts")
+    stats_parser.add_argument("--no-queue", action="store_true")
+    stats_parser.set_defaults(handler=stats)
+
+    for command, (_, help_text) in PASSTHROUGH_COMMANDS.items():
+        subparsers.add_parser(command, help=help_text, add_help=False)
+
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if argv and argv[0] in PASSTHROUGH_COMMANDS:
+        # Parsed by the script itself so that its own --help works
+        module = importlib.import_module(PASSTHROUGH_COMMANDS[argv[0]][0])
+        return module.main(argv[1:])
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
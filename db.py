@@ -0,0 +1,60 @@
+import os
+import logging
+
+# Database name shared by all scrapers
+DATABASE_NAME = "hotel_data"
+
+_client = None
+_collections = {}
+
+
+# Function to connect to MongoDB on first use (pymongo and .env are only loaded here)
+def get_db():
+    global _client
+    if _client is None:
+        from dotenv import load_dotenv
+        from pymongo import MongoClient
+
+        load_dotenv()
+        mongo_uri = os.getenv("MONGO_URI")
+        if not mongo_uri:
+            raise ValueError("MongoDB URI not found in environment variables! Please check your .env file.")
+        _client = MongoClient(mongo_uri)
+    return _client[DATABASE_NAME]
+
+
+# Function to get a collection, creating its unique version index the first time it is used
+def get_collection(name, index_keys=None):
+    if name not in _collections:
+        collection = get_db()[name]
+        if index_keys:
+            # Compound index on the hotel key and "version" for efficient duplicate tracking
+            collection.create_index(index_keys, unique=True)
+            logging.info(f"Connected to MongoDB and ensured index on {', '.join(key for key, _ in index_keys)} for {name}.")
+        _collections[name] = collection
+    return _collections[name]
+
+
+# Function to get the next change sequence number for a collection (read by change_feed.py)
+def next_sequence(name, count=1):
+    from pymongo import ReturnDocument
+
+    counter = get_db()["sequences"].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+# Function to record a sequence number whose insert failed, so change_feed.py can skip it without waiting
+def abandon_sequence(name, seq):
+    from datetime import datetime, timezone
+
+    try:
+        gaps = get_collection("feed_gaps", [("collection", 1), ("seq", 1)])
+        gaps.update_one({"collection": name, "seq": seq}, {"$setOnInsert": {"created_at": datetime.now(timezone.utc)}}, upsert=True)
+    except Exception as e:
+        # The exporter still skips the gap once it has settled
+        logging.warning(f"Failed to record abandoned seq {seq} for {name}: {e}")
@@ -0,0 +1,48 @@
+import os
+import requests
+
+import budgets
+
+# Default cap on a downloaded page, override with MAX_RESPONSE_MB
+MAX_RESPONSE_MB = 5
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    pass
+
+
+# Function to get the size cap for downloaded pages in bytes
+def max_response_bytes():
+    return int(float(os.getenv("MAX_RESPONSE_MB", MAX_RESPONSE_MB)) * 1024 * 1024)
+
+
+# Function to download a page as bytes, giving up once it exceeds the size cap or the fetch timeout
+def fetch_html(url, max_bytes=None):
+    max_bytes = max_bytes or max_response_bytes()
+    try:
+        # GETs are idempotent, so a slow download may be hedged with a duplicate
+        return budgets.call("fetch", _download, url, max_bytes)
+    except requests.exceptions.Timeout as e:
+        # A socket timeout is a slow page too; StageTimeout defers the hotel instead of the scraper skipping it
+        raise budgets.StageTimeout(f"fetch timed out: {url}") from e
+
+
+def _download(url, max_bytes):
+    timeout = (budgets.configured_timeout("connect"), budgets.configured_timeout("fetch"))
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ResponseTooLarge(f"Response of {content_length} bytes exceeds {max_bytes} bytes: {url}")
+
+        # Bytes are handed to BeautifulSoup as-is, so no decoded copy of the page is kept around
+        body = bytearray()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ResponseTooLarge(f"Response exceeds {max_bytes} bytes: {url}")
+
+    return bytes(body)
@@ -1,57 +1,43 @@
-import os
 import logging
-import requests
-from bs4 import BeautifulSoup
-from pymongo import MongoClient, errors
-from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
-from datetime import datetime, timezone
 import json
+from datetime import datetime, timezone
 
-# Load environment variables
-load_dotenv()
+import budgets
+import db
+import translation
+from memory import peak_rss_summary
+from records import HotelPage, PriceRow
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# MongoDB setup
-mongo_uri = os.getenv("MONGO_URI")
-if not mongo_uri:
-    raise ValueError("MongoDB URI not found in environment variables! Please check your .env file.")
-
-try:
-    client = MongoClient(mongo_uri)
-    db = client["hotel_data"]  # Database name
-    collection = db["hotels_golf_extra"]  # Collection name
-
-    # Create a compound index on "hotel_url" and "version" for efficient duplicate tracking
-    collection.create_index([("hotel_url", 1), ("version", 1)], unique=True)
-    logging.info("Successfully connected to MongoDB and ensured compound index on hotel_url and version.")
-except Exception as e:
-    logging.error(f"Failed to connect to MongoDB: {e}")
-    exit(1)
+# MongoDB collection, connected on first use
+def get_collection():
+    return db.get_collection("hotels_golf_extra", [("hotel_url", 1), ("version", 1)])
 
 # Base URL
 base_url = "https://www.golf-extra.com"
 
+# CSS selectors for the hotel page sections
+selectors = [
+    "#ge-hotel-information > div > div > div.col-lg-6.d-flex.mb-5.mb-lg-0 > div",
+    "#ge-hotel-information > div > div > div:nth-child(2) > div",
+]  # Adjust selectors based on the actual structure of the hotel page
+
 # Function to translate text from German to English
 def translate_to_english(text):
-    try:
-        if not text.strip():  # Skip empty strings
-            return text
-        # Translate only the first 500 characters to avoid issues with large chunks
-        return GoogleTranslator(source='de', target='en').translate(text.strip()[:500])  
-    except Exception as e:
-        logging.warning(f"Translation failed for text: {text[:100]}... | Error: {e}")
-        return text  # Return original text if translation fails
+    # Headings and boilerplate lines come from the glossary or cache; translate only the first 500 characters
+    return translation.translate_lines(text, max_chars=500)
 
 # Step 1: Search for the hotel and get the hotel page URL
 def search_hotel(base_url, hotel_name):
+    import requests
+    from bs4 import BeautifulSoup
+    from fetching import fetch_html
+
     search_url = f"{base_url}/suche?tx_solr%5Bq%5D={hotel_name.replace(' ', '+')}"
     try:
-        response = requests.get(search_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(fetch_html(search_url), 'html.parser')
 
         # Find the specific hotel link
         hotel_link = None
@@ -59,6 +45,7 @@ def search_hotel(base_url, hotel_name):
             if hotel_name.lower() in link.text.lower():
                 hotel_link = link['href']
                 break
+        soup.decompose()
 
         if hotel_link:
             full_hotel_url = f"{base_url}{hotel_link}"
@@ -71,67 +58,79 @@ def search_hotel(base_url, hotel_name):
         logging.error(f"Error during HTTP request: {e}")
         return None
 
+# Function to pull the raw (untranslated) text out of a hotel page
+def extract_hotel_page(soup, selectors):
+    # Extract hotel name using the provided selector
+    hotel_name_tag = soup.select_one("#c1070 > section.ge-subheader > div > div.container > header > h1 > span.main-headline")
+    hotel_name = hotel_name_tag.text.strip() if hotel_name_tag else "Unknown"
+
+    # Extract description (section_1) and other data
+    sections = []
+    for selector in selectors:
+        texts = (element.text.strip() for element in soup.select(selector))
+        sections.append(tuple(text for text in texts if text))
+
+    # Extract prices
+    prices = []
+    for item in soup.select(".ge-hotel-information__prices-accordion .accordion-item"):
+        date_range = item.select_one(".accordion-header button").get_text(strip=True)
+        rows = item.select(".ge-price-table__table.ge-hotel-information__offers")
+        for row in rows:
+            room_category = row.select_one(".ge-price-table__column.room").get_text(strip=True)
+            price_columns = row.select(".ge-price-table__column.price")
+            if len(price_columns) >= 2:
+                double_price = price_columns[0].get_text(strip=True)
+                single_surcharge = price_columns[1].get_text(strip=True)
+            else:
+                double_price = single_surcharge = "N/A"
+            prices.append(PriceRow(date_range, room_category, double_price, single_surcharge))
+
+    return HotelPage(hotel_name, tuple(sections), tuple(prices))
+
 # Step 2: Scrape data from the hotel page, clean, translate to English, and save to MongoDB
-def scrape_and_save_to_mongodb(hotel_url, selectors):
+def scrape_and_save_to_mongodb(hotel_url, selectors, search_name=None):
+    import requests
+    from bs4 import BeautifulSoup
+    from pymongo import errors
+    from fetching import fetch_html
+
     try:
-        response = requests.get(hotel_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Extract hotel name using the provided selector
-        hotel_name_tag = soup.select_one("#c1070 > section.ge-subheader > div > div.container > header > h1 > span.main-headline")
-        hotel_name = translate_to_english(hotel_name_tag.text.strip()) if hotel_name_tag else "Unknown"
-
-        # Extract description (section_1) and other data
-        extracted_data = {}
-        for idx, selector in enumerate(selectors):
-            target_data = soup.select(selector)
-            data_list = [translate_to_english(element.text.strip()) for element in target_data if element.text.strip()]
-            extracted_data[f"section_{idx + 1}"] = data_list
-
-        # Extract prices
-        prices_section = soup.select(".ge-hotel-information__prices-accordion .accordion-item")
-        prices = []
-
-        for item in prices_section:
-            date_range = item.select_one(".accordion-header button").get_text(strip=True)
-            rows = item.select(".ge-price-table__table.ge-hotel-information__offers")
-            for row in rows:
-                room_category = row.select_one(".ge-price-table__column.room").get_text(strip=True)
-                price_columns = row.select(".ge-price-table__column.price")
-                if len(price_columns) >= 2:
-                    double_price = price_columns[0].get_text(strip=True)
-                    single_surcharge = price_columns[1].get_text(strip=True)
-                else:
-                    double_price = single_surcharge = "N/A"
-
-                prices.append({
-                    "date_range": date_range,
-                    "room_category": room_category,
-                    "price_details": {
-                        "double_price": double_price,
-                        "single_surcharge": single_surcharge
-                    }
-                })
-
-        # Include prices in extracted_data
-        extracted_data["prices"] = prices
+        soup = BeautifulSoup(fetch_html(hotel_url), 'html.parser')
+        page = extract_hotel_page(soup, selectors)
+        soup.decompose()  # Free the parse tree before the slow translation calls
+        del soup
+
+        # Translate the hotel name and sections; prices stay as published
+        # The name is a proper noun, so it skips the glossary and goes to the remote translator as before
+        hotel_name = page.hotel_name
+        if hotel_name != "Unknown":
+            hotel_name = translation.translate(hotel_name, max_chars=500, use_glossary=False)
+        page = page._replace(
+            hotel_name=hotel_name,
+            sections=tuple(tuple(translate_to_english(text) for text in texts) for texts in page.sections),
+        )
+        extracted_data = page.to_data(include_prices=True)
 
         if extracted_data:
             # Get the current version for the hotel_url
+            collection = get_collection()
             version = collection.count_documents({"hotel_url": hotel_url}) + 1
             document = {
                 "hotel_url": hotel_url,
                 "hotel_name": hotel_name,  # Add hotel_name to the document
+                "search_name": search_name,  # Name from hotels.json used to find the page
                 "data": extracted_data,
                 "version": version,
                 "timestamp": datetime.now(timezone.utc)  # Use timezone-aware datetime
             }
             try:
                 # Attempt to insert the document
+                document["seq"] = db.next_sequence(collection.name)
                 collection.insert_one(document)
                 logging.info(f"Translated and cleaned data successfully saved to MongoDB for hotel: {hotel_name}, URL: {hotel_url}, version: {version}")
+                return version
             except errors.DuplicateKeyError:
+                db.abandon_sequence(collection.name, document["seq"])
                 logging.warning(f"Duplicate key error for hotel_url: {hotel_url}. Retrying with a new version.")
         else:
             logging.warning(f"No data extracted from the page: {hotel_url}")
@@ -139,29 +138,30 @@ def scrape_and_save_to_mongodb(hotel_url, selectors):
     except requests.exceptions.RequestException as e:
         logging.error(f"Error during HTTP request: {e}")
 
+# Function to search and scrape one hotel
+def process_hotel(hotel_name, selectors):
+    logging.info(f"Processing hotel: {hotel_name}")
+    hotel_page_url = search_hotel(base_url, hotel_name)
+    if hotel_page_url:
+        scrape_and_save_to_mongodb(hotel_page_url, selectors, search_name=hotel_name)
+    else:
+        logging.warning(f"Skipping hotel due to missing page: {hotel_name}")
+
 # Step 3: Load JSON with hotel names and process them
 def process_bulk_hotels(json_file, selectors):
     try:
         with open(json_file, "r", encoding="utf-8") as f:
             hotels = json.load(f)
 
-        for hotel_name in hotels:
-            logging.info(f"Processing hotel: {hotel_name}")
-            hotel_page_url = search_hotel(base_url, hotel_name)
-            if hotel_page_url:
-                scrape_and_save_to_mongodb(hotel_page_url, selectors)
-            else:
-                logging.warning(f"Skipping hotel due to missing page: {hotel_name}")
+        # Each hotel gets a time budget; hotels that run out are retried after the others
+        budgets.process_with_budget(hotels, lambda hotel_name: process_hotel(hotel_name, selectors))
+        logging.info(f"Processed {len(hotels)} hotel(s), peak RSS: {peak_rss_summary()}")
+        logging.info(f"Translation: {translation.translation_summary()}")
     except Exception as e:
         logging.error(f"Failed to process hotels from JSON file: {e}")
 
 # Example usage
 if __name__ == "__main__":
-    selectors = [
-        "#ge-hotel-information > div > div > div.col-lg-6.d-flex.mb-5.mb-lg-0 > div",
-        "#ge-hotel-information > div > div > div:nth-child(2) > div",
-    ]  # Adjust selectors based on the actual structure of the hotel page
-
     # JSON file containing hotel names
     hotel_json_file = "hotels.json"  # Make sure this file is in the correct path
 
@@ -0,0 +1,60 @@
+import os
+import sys
+
+# Default browser recycling limits, override with BROWSER_MAX_PAGES and BROWSER_MAX_RSS_MB
+BROWSER_MAX_PAGES = 200
+BROWSER_MAX_RSS_MB = 1500
+
+
+# Function to get the peak resident memory of this process in MB (None if it can't be measured)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory_info = psutil.Process().memory_info()
+    return getattr(memory_info, "peak_wset", memory_info.rss) / (1024 * 1024)
+
+
+# Function to get the resident memory of a process and all its children in MB (needs psutil)
+def process_tree_rss_mb(pid):
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return None
+
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue  # Renderer processes come and go
+    return total / (1024 * 1024)
+
+
+# Function to format peak RSS for run stats log lines
+def peak_rss_summary():
+    peak = peak_rss_mb()
+    return f"{peak:.1f} MB" if peak is not None else "unknown"
+
+
+# Function to read an integer limit from the environment
+def env_limit(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
@@ -0,0 +1,49 @@
+from typing import NamedTuple
+
+# Extracted records are kept as tuples (no per-object __dict__) while a hotel is being
+# processed, and only turned into the nested dicts stored in MongoDB right before saving.
+
+
+class PriceRow(NamedTuple):
+    date_range: str
+    room_category: str
+    double_price: str
+    single_surcharge: str
+
+    def to_document(self):
+        return {
+            "date_range": self.date_range,
+            "room_category": self.room_category,
+            "price_details": {
+                "double_price": self.double_price,
+                "single_surcharge": self.single_surcharge,
+            },
+        }
+
+
+class HotelPage(NamedTuple):
+    hotel_name: str
+    sections: tuple  # One tuple of text blocks per CSS selector
+    prices: tuple = ()  # PriceRow tuples
+
+    # Function to build the "data" field stored in MongoDB
+    def to_data(self, include_prices=False):
+        data = {f"section_{idx + 1}": list(texts) for idx, texts in enumerate(self.sections)}
+        if include_prices:
+            data["prices"] = [row.to_document() for row in self.prices]
+        return data
+
+
+class PriceTable(NamedTuple):
+    hotel_name: str
+    hotel_url: str
+    rows: tuple  # One tuple of cell texts per table row
+
+    # Function to build the document stored in MongoDB
+    def to_document(self, timestamp):
+        return {
+            "hotel_name": self.hotel_name,
+            "hotel_url": self.hotel_url,
+            "table_data": [list(cells) for cells in self.rows],
+            "timestamp": timestamp,
+        }
@@ -0,0 +1,221 @@
+import re
+import sys
+import json
+import math
+import hashlib
+import logging
+import argparse
+from datetime import datetime, timezone, timedelta
+
+import db
+from sites import SITE_COLLECTIONS, golf_motion_url
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Page loads needed to crawl one hotel on each site (search + hotel page, or hotel page only)
+SITE_REQUEST_COST = {
+    "golf-extra": 2,
+    "golf-motion": 1,
+    "classic-golf": 2,
+}
+
+# Default scheduling settings
+HISTORY_DAYS = 120  # How far back to look at versions when estimating change rates
+PRIOR_CHANGE_DAYS = 7  # Assumed mean days between changes for hotels with too little history
+MIN_INTERVAL_HOURS = 12  # Don't recrawl sooner than this unless a price period has ended
+MAX_INTERVAL_DAYS = 21  # Always recrawl once a version is this old
+DEADLINE_WINDOW_DAYS = 7  # Boost hotels whose current price period ends within this window
+DEADLINE_BOOST = 0.5
+
+# Dates like "10.12.2024" or "16.11.24" in price periods and booking deadlines
+DATE_PATTERN = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})\b")
+
+
+# Function to map a stored document back to the hotels.json name it was crawled for
+def hotel_key(site, document, name_lookup):
+    if site == "classic-golf":
+        return document.get("hotel_name")
+    if site == "golf-motion":
+        return name_lookup.get(document.get("hotel_url"))
+    # golf-extra: older documents only have the translated page headline
+    if document.get("search_name"):
+        return document["search_name"]
+    return name_lookup.get((document.get("hotel_name") or "").strip().lower())
+
+
+# Function to fingerprint the scraped content of a version (ignoring version number and timestamp)
+def content_hash(document):
+    content = document.get("table_data") if "table_data" in document else document.get("data")
+    return hashlib.md5(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+# Function to collect every date mentioned in a document's scraped content
+def extract_dates(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from extract_dates(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from extract_dates(item)
+    elif isinstance(value, str):
+        for day, month, year in DATE_PATTERN.findall(value):
+            year = int(year) + 2000 if len(year) == 2 else int(year)
+            try:
+                yield datetime(year, int(month), int(day), tzinfo=timezone.utc)
+            except ValueError:
+                continue
+
+
+# Function to estimate changes per day from a hotel's version history
+def estimate_change_rate(versions, prior_days=PRIOR_CHANGE_DAYS):
+    # versions: list of (timestamp, content_hash) sorted by timestamp
+    intervals = len(versions) - 1
+    if intervals < 1:
+        return 1 / prior_days
+
+    span_days = (versions[-1][0] - versions[0][0]).total_seconds() / 86400
+    if span_days <= 0:
+        return 1 / prior_days
+
+    changes = sum(1 for previous, current in zip(versions, versions[1:]) if previous[1] != current[1])
+    mean_interval = span_days / intervals
+
+    # We only see whether a page changed between two crawls, not how often, so use the
+    # bias-reduced Poisson estimator instead of changes / span_days (which undercounts).
+    rate = -math.log((intervals - changes + 0.5) / (intervals + 0.5)) / mean_interval
+
+    # Blend in the prior so one or two crawls don't pin the rate at zero
+    weight = intervals / (intervals + 2)
+    return weight * rate + (1 - weight) * (1 / prior_days)
+
+
+# Function to score how much recrawling a hotel is worth right now (0 = pointless, >= 1 = overdue)
+def recrawl_priority(versions, latest_document, now, settings):
+    if not versions:
+        return 1.0 + settings["deadline_boost"], "never crawled"
+
+    last_crawl = versions[-1][0]
+    age_days = (now - last_crawl).total_seconds() / 86400
+
+    # A price period or booking deadline that ended since the last crawl means the page has changed
+    dates = sorted(set(extract_dates(latest_document.get("table_data") or latest_document.get("data"))))
+    if any(last_crawl < date <= now for date in dates):
+        return 1.0 + settings["deadline_boost"], "price period ended"
+
+    if age_days >= settings["max_interval_days"]:
+        return 1.0, "max interval reached"
+
+    # Probability the page changed since the last crawl under a Poisson model
+    rate = estimate_change_rate(versions, settings["prior_days"])
+    priority = 1 - math.exp(-rate * age_days)
+    reason = f"change rate {rate:.3f}/day"
+
+    # Space out recrawls even while a price period is about to end
+    if age_days * 24 < settings["min_interval_hours"]:
+        return 0.0, "crawled recently"
+
+    upcoming = [date for date in dates if date > now]
+    if upcoming:
+        days_left = (upcoming[0] - now).total_seconds() / 86400
+        if days_left <= settings["deadline_window_days"]:
+            priority += settings["deadline_boost"] * (1 - days_left / settings["deadline_window_days"])
+            reason += f", period ends in {days_left:.1f} days"
+
+    return priority, reason
+
+
+# Function to load the version history of every hotel on a site
+def load_history(collection, site, hotels, since):
+    from pymongo import ASCENDING
+
+    # The scrapers only index (key, version); without this every run scans the whole collection
+    collection.create_index([("timestamp", ASCENDING)])
+
+    if site == "golf-motion":
+        name_lookup = {golf_motion_url(name): name for name in hotels}
+    else:
+        name_lookup = {name.strip().lower(): name for name in hotels}
+
+    history = {}
+    latest = {}
+    projection = {"_id": 0, "hotel_url": 1, "hotel_name": 1, "search_name": 1, "timestamp": 1, "data": 1, "table_data": 1}
+    for document in collection.find({"timestamp": {"$gte": since}}, projection).sort("timestamp", 1):
+        name = hotel_key(site, document, name_lookup)
+        if name is None or document.get("timestamp") is None:
+            continue
+        timestamp = document["timestamp"]
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)  # pymongo returns naive UTC datetimes
+        history.setdefault(name, []).append((timestamp, content_hash(document)))
+        latest[name] = document
+    return history, latest
+
+
+# Function to pick the hotel x site crawls worth doing within a request budget
+def plan_recrawls(database, hotels, budget, sites=None, now=None, **overrides):
+    now = now or datetime.now(timezone.utc)
+    settings = {
+        "history_days": HISTORY_DAYS,
+        "prior_days": PRIOR_CHANGE_DAYS,
+        "min_interval_hours": MIN_INTERVAL_HOURS,
+        "max_interval_days": MAX_INTERVAL_DAYS,
+        "deadline_window_days": DEADLINE_WINDOW_DAYS,
+        "deadline_boost": DEADLINE_BOOST,
+    }
+    settings.update(overrides)
+    since = now - timedelta(days=settings["history_days"])
+
+    candidates = []
+    for site in sites or list(SITE_COLLECTIONS):
+        history, latest = load_history(database[SITE_COLLECTIONS[site]], site, hotels, since)
+        for hotel_name in hotels:
+            priority, reason = recrawl_priority(history.get(hotel_name, []), latest.get(hotel_name), now, settings)
+            if priority > 0:
+                candidates.append({"site": site, "hotel_name": hotel_name, "priority": priority, "reason": reason})
+
+    # Spend the budget on the most likely changes per request
+    candidates.sort(key=lambda c: c["priority"] / SITE_REQUEST_COST[c["site"]], reverse=True)
+    plan = []
+    spent = 0
+    for candidate in candidates:
+        cost = SITE_REQUEST_COST[candidate["site"]]
+        if spent + cost > budget:
+            continue
+        plan.append(candidate)
+        spent += cost
+
+    logging.info(f"Planned {len(plan)} of {len(candidates)} candidate crawl(s) using {spent}/{budget} requests")
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan recrawls from each hotel's observed change rate")
+    parser.add_argument("json_file", nargs="?", default="hotels.json")
+    parser.add_argument("--budget", type=int, required=True, help="Maximum page requests for this run")
+    parser.add_argument("--site", action="append", choices=list(SITE_COLLECTIONS))
+    parser.add_argument("--enqueue", action="store_true", help="Push the plan to the crawl_jobs queue")
+    args = parser.parse_args(argv)
+
+    with open(args.json_file, "r", encoding="utf-8") as f:
+        hotels = json.load(f)
+
+    plan = plan_recrawls(db.get_db(), hotels, args.budget, sites=args.site)
+    if args.enqueue:
+        import work_queue
+
+        jobs = work_queue.get_jobs_collection()
+        # The queue sorts on integer priorities
+        entries = [(c["site"], c["hotel_name"], int(c["priority"] * 1000)) for c in plan]
+        # Jobs left over from earlier plans or enqueues would otherwise be fetched on top of the budget
+        retired = work_queue.retire_unplanned(jobs, entries, args.site or list(SITE_COLLECTIONS))
+        queued = work_queue.enqueue_jobs(jobs, entries)
+        logging.info(f"Queued {queued} job(s) from the recrawl plan, retired {retired} unplanned job(s)")
+    else:
+        for candidate in plan:
+            print(f"{candidate['priority']:.3f}\t{candidate['site']}\t{candidate['hotel_name']}\t{candidate['reason']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import os
+import importlib.util
+
+# Scraper script for each site
+SITE_SCRIPTS = {
+    "golf-extra": "golf-extra2.py",
+    "golf-motion": "golf-motion.py",
+    "classic-golf": "classic-golf.py",
+}
+
+# Version history collection for each site
+SITE_COLLECTIONS = {
+    "golf-extra": "hotels_golf_extra",
+    "golf-motion": "hotels_golf-motion",
+    "classic-golf": "hotels_classic_golf",
+}
+
+# Field each site's versions are tracked by
+SITE_KEY_FIELDS = {
+    "golf-extra": "hotel_url",
+    "golf-motion": "hotel_url",
+    "classic-golf": "hotel_name",
+}
+
+# Function to build the golf-motion hotel page URL for a hotels.json name (golf-motion documents are keyed by it)
+def golf_motion_url(hotel_name, base_url="https://www.golfmotion.com"):
+    # Replace spaces with dashes and convert to lowercase to match URL format
+    formatted_name = hotel_name.lower().replace(' ', '-')
+    return f"{base_url}/{formatted_name}.html"
+
+
+_site_modules = {}
+
+
+# Function to load a site's scraper script (the file names are not importable as modules)
+def load_site(site):
+    if site not in _site_modules:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SITE_SCRIPTS[site])
+        spec = importlib.util.spec_from_file_location(site.replace("-", "_"), path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _site_modules[site] = module
+    return _site_modules[site]
+
+
+class CrawlError(Exception):
+    pass
+
+
+class SiteCrawler:
+    def __init__(self):
+        self.browser = None  # Chrome session, only started for classic-golf jobs
+
+    # Function to crawl one hotel on one site; returns the stored version
+    def crawl(self, site, hotel_name):
+        module = load_site(site)
+
+        if site == "golf-extra":
+            hotel_url = module.search_hotel(module.base_url, hotel_name)
+            if not hotel_url:
+                raise CrawlError(f"No hotel page found for '{hotel_name}'")
+            version = module.scrape_and_save_to_mongodb(hotel_url, module.selectors, search_name=hotel_name)
+
+        elif site == "golf-motion":
+            hotel_url = module.construct_hotel_url(module.base_url, hotel_name)
+            version = module.scrape_and_save_to_mongodb(hotel_url, module.selectors)
+
+        elif site == "classic-golf":
+            if self.browser is None:
+                self.browser = module.BrowserSession()
+            extracted_data = module.search_hotel_and_extract_data(hotel_name, self.browser.get_driver())
+            if not extracted_data:
+                # The browser may be in a bad state, start a fresh one for the next job
+                self.close()
+                raise CrawlError(f"No price table extracted for '{hotel_name}'")
+            version = module.save_to_mongodb(extracted_data)
+
+        else:
+            raise CrawlError(f"Unknown site: {site}")
+
+        if version is None:
+            raise CrawlError(f"Nothing stored for '{hotel_name}' on {site}")
+        return version
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
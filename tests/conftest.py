@@ -0,0 +1,26 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# The scripts live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests using the mongo_database fixture run against a local mongod; override with MONGO_TEST_URI
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def mongo_database():
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000, tz_aware=True)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"No mongod reachable at {MONGO_TEST_URI}")
+
+    database = client[f"test_hotel_data_{uuid.uuid4().hex[:8]}"]
+    yield database
+    client.drop_database(database.name)
+    client.close()
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+from sites import load_site
+
+
+class FakeDriver:
+    def __init__(self):
+        self.service = SimpleNamespace(process=None)
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def classic_golf(monkeypatch):
+    module = load_site("classic-golf")
+    drivers = []
+
+    def create_driver():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(module, "create_driver", create_driver)
+    return module, drivers
+
+
+def test_browser_is_reused_until_max_pages_then_recycled(classic_golf):
+    module, drivers = classic_golf
+    session = module.BrowserSession(max_pages=3 * module.PAGES_PER_HOTEL)
+
+    first = [session.get_driver() for _ in range(3)]
+    assert len(drivers) == 1
+    assert all(driver is drivers[0] for driver in first)
+
+    assert session.get_driver() is drivers[1]
+    assert drivers[0].quit_called
+    assert session.restarts == 1
+    assert session.pages == module.PAGES_PER_HOTEL
+
+
+def test_close_quits_the_browser(classic_golf):
+    module, drivers = classic_golf
+    session = module.BrowserSession(max_pages=10)
+    session.get_driver()
+
+    session.close()
+    assert drivers[0].quit_called
+    assert session.driver is None
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pytest
+
+import budgets
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(budgets, "latencies", defaultdict(budgets.LatencyTracker))
+    monkeypatch.setattr(budgets, "stats", Counter())
+    monkeypatch.setitem(budgets.STAGE_TIMEOUTS, "test", 0.5)
+    monkeypatch.delenv("HEDGE_REQUESTS", raising=False)
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()  # Let abandoned calls finish
+
+
+def warm_up(stage, seconds=0.01):
+    for _ in range(budgets.HEDGE_MIN_SAMPLES):
+        budgets.latencies[stage].record(seconds)
+
+
+def test_call_returns_result_and_records_latency():
+    assert budgets.call("test", lambda x: x * 2, 21) == 42
+    assert len(budgets.latencies["test"]) == 1
+
+
+def test_call_raises_errors_without_hedging():
+    warm_up("test")
+
+    def fail():
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError):
+        budgets.call("test", fail)
+    assert budgets.stats["test_hedges"] == 0
+
+
+def test_call_times_out(monkeypatch, release):
+    monkeypatch.setitem(budgets.STAGE_TIMEOUTS, "test", 0.05)
+
+    with pytest.raises(budgets.StageTimeout):
+        budgets.call("test", release.wait)
+    assert budgets.stats["test_timeouts"] == 1
+
+
+def test_call_raises_budget_exceeded_when_hotel_budget_runs_out(release):
+    with budgets.hotel_budget(0.05):
+        with pytest.raises(budgets.BudgetExceeded):
+            budgets.call("test", release.wait)
+        time.sleep(0.06)
+        with pytest.raises(budgets.BudgetExceeded):
+            budgets.stage_timeout("test")
+
+
+def test_slow_call_is_hedged(release):
+    warm_up("test")
+    calls = []
+
+    def slow_first_call():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait()
+            return "first"
+        return "hedged"
+
+    assert budgets.call("test", slow_first_call) == "hedged"
+    assert budgets.stats["test_hedges"] == 1
+
+
+def test_no_hedge_when_disabled(monkeypatch, release):
+    monkeypatch.setenv("HEDGE_REQUESTS", "0")
+    monkeypatch.setitem(budgets.STAGE_TIMEOUTS, "test", 0.1)
+    warm_up("test")
+
+    with pytest.raises(budgets.StageTimeout):
+        budgets.call("test", release.wait)
+    assert budgets.stats["test_hedges"] == 0
+
+
+def test_no_hedge_while_abandoned_calls_hold_the_pool(monkeypatch, release):
+    monkeypatch.setattr(budgets, "MAX_ABANDONED_CALLS", 0)
+    monkeypatch.setitem(budgets.STAGE_TIMEOUTS, "test", 0.1)
+    warm_up("test")
+
+    with pytest.raises(budgets.StageTimeout):
+        budgets.call("test", release.wait)
+    assert budgets.stats["test_hedges"] == 0
+    assert budgets.stats["test_hedges_skipped"] == 1
+
+
+def test_abandoned_calls_are_released_when_they_finish(monkeypatch):
+    monkeypatch.setitem(budgets.STAGE_TIMEOUTS, "test", 0.05)
+    event = threading.Event()
+    before = budgets.abandoned_calls()
+
+    with pytest.raises(budgets.StageTimeout):
+        budgets.call("test", event.wait)
+    assert budgets.abandoned_calls() == before + 1
+
+    event.set()
+    for _ in range(100):
+        if budgets.abandoned_calls() == before:
+            break
+        time.sleep(0.01)
+    assert budgets.abandoned_calls() == before
+
+
+def test_process_with_budget_retries_deferred_hotels_and_counts_each_once(monkeypatch):
+    monkeypatch.setenv("HOTEL_BUDGET_SECONDS", "1")
+    monkeypatch.setenv("RETRY_BUDGET_SECONDS", "2")
+    seen = []
+    summaries = []
+    monkeypatch.setattr(budgets, "latency_summary", lambda values: summaries.append(values) or "")
+
+    def process_hotel(hotel_name):
+        seen.append((hotel_name, round(budgets.remaining())))
+        if hotel_name == "Slow" and len(seen) <= 3:
+            raise budgets.BudgetExceeded("too slow")
+        if hotel_name == "Hopeless":
+            raise budgets.BudgetExceeded("too slow")
+
+    assert budgets.process_with_budget(["Fast", "Slow", "Hopeless"], process_hotel) == ["Hopeless"]
+    assert seen == [("Fast", 1), ("Slow", 1), ("Hopeless", 1), ("Slow", 2), ("Hopeless", 2)]
+    assert len(summaries[0]) == 3
+
+
+def test_budget_seconds_uses_retry_budget_for_retries(monkeypatch):
+    monkeypatch.setenv("HOTEL_BUDGET_SECONDS", "10")
+    monkeypatch.setenv("RETRY_BUDGET_SECONDS", "30")
+
+    assert budgets.budget_seconds() == 10
+    assert budgets.budget_seconds(retry=True) == 30
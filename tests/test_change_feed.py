@@ -0,0 +1,138 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+import change_feed
+import db
+
+
+def test_diff_documents_reports_changed_added_and_removed_paths():
+    old = {"hotel_name": "Hotel A", "data": {"section_1": ["Halbpension", "Pool"], "prices": [{"price": "100"}]}}
+    new = {"hotel_name": "Hotel A", "data": {"section_1": ["Halbpension"], "prices": [{"price": "120"}], "section_2": ["Spa"]}}
+
+    assert change_feed.diff_documents(old, new) == {
+        "data.prices.0.price": {"old": "100", "new": "120"},
+        "data.section_1.1": {"old": "Pool", "new": None},
+        "data.section_2": {"old": None, "new": ["Spa"]},
+    }
+
+
+def test_diff_documents_of_identical_documents_is_empty():
+    document = {"data": {"section_1": ["Halbpension"]}, "table_data": [["Zimmer", "100"]]}
+    assert change_feed.diff_documents(document, document) == {}
+
+
+def test_diff_documents_compares_values_of_different_types():
+    assert change_feed.diff_documents({"data": ["a"]}, {"data": "a"}) == {"data": {"old": ["a"], "new": "a"}}
+
+
+@pytest.fixture
+def feed_db(mongo_database, monkeypatch):
+    monkeypatch.setattr(db, "get_db", lambda: mongo_database)
+    monkeypatch.setattr(db, "_collections", {})
+    monkeypatch.setattr(change_feed, "GAP_POLL_SECONDS", 0.01)
+    return mongo_database
+
+
+def insert_versions(collection, seqs, hotel_url="https://example.com/hotel-a"):
+    for version, seq in enumerate(seqs, start=1):
+        collection.insert_one({"hotel_url": hotel_url, "version": version, "seq": seq, "data": {"section_1": [f"v{version}"]}})
+
+
+def test_read_batch_stops_at_the_first_missing_seq(feed_db):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 2, 4, 5, 8])
+
+    batch, gap = change_feed.read_batch(collection, 0, 100)
+    assert [document["seq"] for document in batch] == [1, 2]
+    assert gap == 3
+
+
+def test_read_batch_skips_abandoned_seqs_and_settled_gaps(feed_db):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 2, 4, 5, 8])
+
+    batch, gap = change_feed.read_batch(collection, 0, 100, abandoned={3})
+    assert [document["seq"] for document in batch] == [1, 2, 4, 5]
+    assert gap == 6
+
+    batch, gap = change_feed.read_batch(collection, 0, 100, abandoned={3}, settled_gap=6)
+    assert [document["seq"] for document in batch] == [1, 2, 4, 5, 8]
+    assert gap is None
+
+
+def test_read_batch_respects_batch_size(feed_db):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 2, 3])
+
+    batch, gap = change_feed.read_batch(collection, 1, 1)
+    assert [document["seq"] for document in batch] == [2]
+    assert gap is None
+
+
+def test_gap_settles_after_settle_seconds_by_the_database_clock(feed_db):
+    checkpoints = change_feed.get_checkpoints()
+
+    assert not change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 3, settle_seconds=60)
+    assert not change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 3, settle_seconds=60)
+
+    checkpoints.update_one({"_id": "warehouse:hotels_golf_extra"}, {"$set": {"gap_first_seen": datetime(2000, 1, 1)}})
+    assert change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 3, settle_seconds=60)
+
+    # A different gap starts its own clock
+    assert not change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 9, settle_seconds=60)
+    assert change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 9, settle_seconds=0)
+
+
+def test_advance_checkpoint_only_moves_from_the_expected_seq(feed_db):
+    checkpoints = change_feed.get_checkpoints()
+    change_feed.gap_settled(checkpoints, "warehouse", "hotels_golf_extra", 3, settle_seconds=60)  # Creates it without seq
+
+    assert change_feed.read_checkpoint(checkpoints, "warehouse", "hotels_golf_extra") == 0
+    assert change_feed.advance_checkpoint(checkpoints, "warehouse", "hotels_golf_extra", 0, 5, "a.ndjson")
+    assert not change_feed.advance_checkpoint(checkpoints, "warehouse", "hotels_golf_extra", 0, 7, "b.ndjson")
+    assert change_feed.advance_checkpoint(checkpoints, "warehouse", "hotels_golf_extra", 5, 7, "b.ndjson")
+    assert change_feed.read_checkpoint(checkpoints, "warehouse", "hotels_golf_extra") == 7
+    assert change_feed.read_checkpoint(checkpoints, "other", "hotels_golf_extra") == 0
+
+
+def test_prepare_collection_numbers_old_documents_by_timestamp(feed_db):
+    collection = feed_db["hotels_golf_extra"]
+    collection.insert_many([
+        {"hotel_url": "b", "version": 1, "timestamp": datetime(2024, 2, 1, tzinfo=timezone.utc)},
+        {"hotel_url": "a", "version": 1, "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+    ])
+
+    assert change_feed.prepare_collection(collection) == 2
+    assert [document["hotel_url"] for document in collection.find().sort("seq", 1)] == ["a", "b"]
+    assert change_feed.prepare_collection(collection) == 0
+    assert db.next_sequence("hotels_golf_extra") == 3
+
+
+def test_export_skips_abandoned_seqs_without_waiting(feed_db, tmp_path):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 3])
+    db.abandon_sequence("hotels_golf_extra", 2)
+
+    assert change_feed.export_collection("hotels_golf_extra", str(tmp_path), settle_seconds=3600) == 2
+    assert change_feed.read_checkpoint(change_feed.get_checkpoints(), "warehouse", "hotels_golf_extra") == 3
+
+
+def test_export_stops_at_an_unsettled_gap_and_resumes_once_it_fills(feed_db, tmp_path):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 3])
+
+    assert change_feed.export_collection("hotels_golf_extra", str(tmp_path), settle_seconds=3600, wait_for_gaps=False) == 1
+    collection.insert_one({"hotel_url": "https://example.com/hotel-b", "version": 1, "seq": 2})
+    assert change_feed.export_collection("hotels_golf_extra", str(tmp_path), settle_seconds=3600, wait_for_gaps=False) == 2
+
+    exported = sorted(os.listdir(tmp_path / "hotels_golf_extra"))
+    assert exported == ["000000000001-000000000001.ndjson", "000000000002-000000000003.ndjson"]
+
+
+def test_export_waits_for_a_gap_to_settle_within_the_run(feed_db, tmp_path):
+    collection = feed_db["hotels_golf_extra"]
+    insert_versions(collection, [1, 3])
+
+    assert change_feed.export_collection("hotels_golf_extra", str(tmp_path), settle_seconds=1) == 2
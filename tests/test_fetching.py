@@ -0,0 +1,80 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+import budgets  # noqa: E402
+import fetching  # noqa: E402
+from sites import load_site  # noqa: E402
+
+PAGE = b"x" * 4096
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(1)
+        self.send_response(200)
+        if self.path == "/with-length":
+            self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_html_returns_page_under_the_cap(server_url):
+    assert fetching.fetch_html(f"{server_url}/with-length", max_bytes=len(PAGE)) == PAGE
+
+
+@pytest.mark.parametrize("path", ["/with-length", "/streamed"])
+def test_fetch_html_raises_past_the_cap(server_url, path):
+    with pytest.raises(fetching.ResponseTooLarge):
+        fetching.fetch_html(f"{server_url}{path}", max_bytes=1024)
+
+
+def test_max_response_bytes_reads_env(monkeypatch):
+    monkeypatch.setenv("MAX_RESPONSE_MB", "0.5")
+    assert fetching.max_response_bytes() == 512 * 1024
+
+
+@pytest.fixture
+def short_fetch_timeout(monkeypatch):
+    monkeypatch.setenv("TIMEOUT_FETCH", "0.2")
+    monkeypatch.setenv("HEDGE_REQUESTS", "0")
+
+
+def test_fetch_timeout_is_a_stage_timeout(server_url, short_fetch_timeout):
+    with pytest.raises(budgets.StageTimeout):
+        fetching.fetch_html(f"{server_url}/slow")
+
+
+def test_scraper_lets_a_fetch_timeout_defer_the_hotel(server_url, short_fetch_timeout):
+    golf_extra = load_site("golf-extra")
+    with pytest.raises(budgets.Deferred):
+        golf_extra.search_hotel(f"{server_url}/slow", "Hotel A")
+
+
+def test_fetch_timeout_sends_the_hotel_to_the_retry_pass(server_url, short_fetch_timeout):
+    attempts = []
+
+    def process_hotel(hotel_name):
+        attempts.append(hotel_name)
+        path = "/slow" if hotel_name == "Slow hotel" and len(attempts) < 3 else "/with-length"
+        fetching.fetch_html(f"{server_url}{path}")
+
+    assert budgets.process_with_budget(["Slow hotel", "Fast hotel"], process_hotel) == []
+    assert attempts == ["Slow hotel", "Fast hotel", "Slow hotel"]
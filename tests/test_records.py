@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from records import HotelPage, PriceRow, PriceTable
+
+
+def test_hotel_page_to_data_matches_stored_layout():
+    page = HotelPage(
+        "Hotel A",
+        (("Description",), ("Services", "Golf")),
+        (PriceRow("01.11.24 - 30.11.24", "Double room", "1.099,- €", "150,- €"),),
+    )
+
+    assert page.to_data() == {"section_1": ["Description"], "section_2": ["Services", "Golf"]}
+    assert page.to_data(include_prices=True) == {
+        "section_1": ["Description"],
+        "section_2": ["Services", "Golf"],
+        "prices": [{
+            "date_range": "01.11.24 - 30.11.24",
+            "room_category": "Double room",
+            "price_details": {"double_price": "1.099,- €", "single_surcharge": "150,- €"},
+        }],
+    }
+
+
+def test_hotel_page_without_prices_stores_empty_price_list():
+    assert HotelPage("Hotel A", ((),)).to_data(include_prices=True) == {"section_1": [], "prices": []}
+
+
+def test_price_table_to_document_matches_stored_layout():
+    timestamp = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    table = PriceTable("Hotel A", "https://example.com/hotel-a", (("Room", "Price"), ("Double room", "100")))
+
+    assert table.to_document(timestamp) == {
+        "hotel_name": "Hotel A",
+        "hotel_url": "https://example.com/hotel-a",
+        "table_data": [["Room", "Price"], ["Double room", "100"]],
+        "timestamp": timestamp,
+    }
@@ -0,0 +1,81 @@
+import math
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import scheduler
+from sites import load_site
+
+NOW = datetime(2024, 11, 1, tzinfo=timezone.utc)
+SETTINGS = {
+    "prior_days": scheduler.PRIOR_CHANGE_DAYS,
+    "min_interval_hours": scheduler.MIN_INTERVAL_HOURS,
+    "max_interval_days": scheduler.MAX_INTERVAL_DAYS,
+    "deadline_window_days": scheduler.DEADLINE_WINDOW_DAYS,
+    "deadline_boost": scheduler.DEADLINE_BOOST,
+}
+
+
+def history(hashes, every_days=1, end=NOW):
+    start = end - timedelta(days=every_days * (len(hashes) - 1))
+    return [(start + timedelta(days=every_days * i), content) for i, content in enumerate(hashes)]
+
+
+def test_change_rate_falls_back_to_prior_without_history():
+    assert scheduler.estimate_change_rate([], prior_days=7) == pytest.approx(1 / 7)
+    assert scheduler.estimate_change_rate(history(["a"]), prior_days=7) == pytest.approx(1 / 7)
+
+
+def test_change_rate_is_low_for_pages_that_never_change():
+    rate = scheduler.estimate_change_rate(history(["a"] * 31), prior_days=7)
+    assert 0 < rate < 1 / 7
+
+
+def test_change_rate_is_high_for_pages_that_always_change():
+    rate = scheduler.estimate_change_rate(history([str(i) for i in range(31)]), prior_days=7)
+    assert rate > 1
+
+
+def test_change_rate_uses_bias_reduced_estimator():
+    versions = history(["a", "a", "b", "b", "c"], every_days=2)  # 2 changes in 4 intervals of 2 days
+    expected = -math.log((4 - 2 + 0.5) / (4 + 0.5)) / 2
+    weight = 4 / 6
+    assert scheduler.estimate_change_rate(versions, prior_days=7) == pytest.approx(weight * expected + (1 - weight) / 7)
+
+
+def test_never_crawled_hotel_is_overdue():
+    priority, reason = scheduler.recrawl_priority([], None, NOW, SETTINGS)
+    assert priority > 1
+    assert reason == "never crawled"
+
+
+def test_ended_price_period_forces_a_crawl():
+    versions = history(["a", "a"], end=NOW - timedelta(days=2))
+    document = {"data": {"section_1": ["Reisezeitraum 01.10.2024 - 31.10.2024"]}}
+    priority, reason = scheduler.recrawl_priority(versions, document, NOW, SETTINGS)
+    assert priority > 1
+    assert reason == "price period ended"
+
+
+def test_recent_crawl_is_not_repeated_even_with_a_deadline_coming_up():
+    versions = history(["a", "b"], end=NOW - timedelta(hours=1))
+    document = {"data": {"section_1": ["Bei Buchung bis zum 03.11.2024"]}}
+    assert scheduler.recrawl_priority(versions, document, NOW, SETTINGS) == (0.0, "crawled recently")
+
+
+def test_upcoming_deadline_boosts_priority():
+    versions = history(["a", "b"], end=NOW - timedelta(days=1))
+    with_deadline = {"data": {"section_1": ["Bei Buchung bis zum 03.11.2024"]}}
+    without_deadline = {"data": {"section_1": ["Halbpension"]}}
+
+    boosted, reason = scheduler.recrawl_priority(versions, with_deadline, NOW, SETTINGS)
+    plain, _ = scheduler.recrawl_priority(versions, without_deadline, NOW, SETTINGS)
+    assert boosted > plain
+    assert "period ends in 2.0 days" in reason
+
+
+def test_golf_motion_history_uses_the_scraper_url_rule():
+    golf_motion = load_site("golf-motion")
+    expected = golf_motion.construct_hotel_url(golf_motion.base_url, "Hotel Las Arenas")
+    assert scheduler.golf_motion_url("Hotel Las Arenas") == expected
+    assert scheduler.hotel_key("golf-motion", {"hotel_url": expected}, {expected: "Hotel Las Arenas"}) == "Hotel Las Arenas"
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from sites import SITE_SCRIPTS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pymongo", "selenium", "bs4", "requests", "deep_translator", "dotenv"]
+
+
+@pytest.mark.parametrize("site", list(SITE_SCRIPTS))
+def test_loading_a_site_does_not_import_heavy_modules(site):
+    # Run in a fresh interpreter so modules imported by other tests don't count
+    script = (
+        "import sys, json, sites\n"
+        f"sites.load_site({site!r})\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
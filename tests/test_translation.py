@@ -0,0 +1,85 @@
+import pytest
+
+import translation
+
+
+@pytest.fixture
+def remote_calls(monkeypatch):
+    calls = []
+
+    def fake_remote_translate(text):
+        calls.append(text)
+        return f"EN({text})"
+
+    monkeypatch.setattr(translation, "_remote_translate", fake_remote_translate)
+    return calls
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", translation.EMPTY),
+    ("   ", translation.EMPTY),
+    ("2069,- €", translation.NUMERIC),
+    ("16.11.24 – 08.12.24", translation.NUMERIC),
+    ("250 EUR", translation.NUMERIC),
+    ("Doppelzimmer Meerblick", translation.GLOSSARY),
+    ("Einzelzimmer-Zuschlag 250,- €", translation.GLOSSARY),
+    ("7 Übernachtungen mit Frühstück", translation.GLOSSARY),
+    ("Deluxe Room Sea View", translation.GLOSSARY),
+    ("Das Hotel liegt direkt am Strand", translation.FREE_TEXT),
+])
+def test_classify_segment(text, expected):
+    assert translation.classify_segment(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Doppelzimmer Meerblick", "Double room sea view"),
+    ("Einzelzimmer-Zuschlag 250,- €", "Single room supplement 250,- €"),
+    ("Deluxe Room Sea View", "Deluxe Room Sea View"),
+    ("Hotel Resort", "Hotel Resort"),
+    ("Zimmer", "Room"),
+])
+def test_glossary_translation_keeps_source_casing_of_unchanged_terms(text, expected):
+    assert translation.glossary_translation(text) == expected
+
+
+def test_translate_only_sends_free_text_to_remote(remote_calls):
+    assert translation.translate("2069,- €") == "2069,- €"
+    assert translation.translate("Halbpension") == "Half board"
+    assert translation.translate("Das Hotel liegt am Strand") == "EN(Das Hotel liegt am Strand)"
+    assert remote_calls == ["Das Hotel liegt am Strand"]
+
+
+def test_translate_lines_keeps_local_lines_local_and_batches_free_text(remote_calls):
+    block = (
+        "  Leistungen\n\n  7 Übernachtungen mit Frühstück \n"
+        "Das Hotel liegt am Strand.\n\nEs hat einen Pool.\n\n"
+        "Halbpension\n2069,- €\nNoch ein Satz"
+    )
+
+    assert translation.translate_lines(block) == (
+        "Services\n\n7 nights with breakfast\n"
+        "EN(Das Hotel liegt am Strand.\n\nEs hat einen Pool.)\n\n"
+        "Half board\n2069,- €\nEN(Noch ein Satz)"
+    )
+    assert remote_calls == ["Das Hotel liegt am Strand.\n\nEs hat einen Pool.", "Noch ein Satz"]
+
+
+def test_translate_lines_caps_the_whole_block(remote_calls):
+    block = "Leistungen\n" + "Das Hotel liegt am Strand. " * 40
+
+    assert len(translation.translate_lines(block, max_chars=100)) < 120
+    assert sum(len(call) for call in remote_calls) <= 100 - len("Leistungen\n")
+
+
+def test_translate_returns_original_text_when_remote_fails(monkeypatch):
+    def failing_remote_translate(text):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(translation, "_remote_translate", failing_remote_translate)
+    assert translation.translate("Das Hotel liegt am Strand") == "Das Hotel liegt am Strand"
+
+
+def test_translate_without_glossary_sends_names_to_remote(remote_calls):
+    assert translation.translate("Villa Meerblick", use_glossary=False) == "EN(Villa Meerblick)"
+    assert translation.translate("Villa Meerblick") == "Villa sea view"
+    assert remote_calls == ["Villa Meerblick"]
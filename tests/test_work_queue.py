@@ -0,0 +1,150 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import work_queue  # noqa: E402
+
+
+@pytest.fixture
+def jobs(mongo_database):
+    collection = mongo_database["crawl_jobs"]
+    work_queue.ensure_indexes(collection)
+    return collection
+
+
+def make_claimable(jobs, job):
+    jobs.update_one({"_id": job["_id"]}, {"$set": {"available_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+
+def test_claim_takes_highest_priority_and_leases_it(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Low", 0), ("golf-extra", "High", 5)])
+
+    job = work_queue.claim_job(jobs, "worker-1", lease_seconds=60)
+    assert job["hotel_name"] == "High"
+    assert job["state"] == work_queue.LEASED
+    assert job["attempts"] == 1
+    assert job["worker_id"] == "worker-1"
+    assert job["lease_expires_at"] > datetime.now(timezone.utc)
+
+    assert work_queue.claim_job(jobs, "worker-2")["hotel_name"] == "Low"
+    assert work_queue.claim_job(jobs, "worker-3") is None
+
+
+def test_claim_filters_by_site(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0), ("golf-motion", "Hotel A", 0)])
+
+    job = work_queue.claim_job(jobs, "worker-1", sites=["golf-motion"])
+    assert job["site"] == "golf-motion"
+    assert work_queue.claim_job(jobs, "worker-1", sites=["golf-motion"]) is None
+
+
+def test_expired_lease_is_requeued_and_old_lease_cannot_complete(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+    stale = work_queue.claim_job(jobs, "dead-worker", lease_seconds=-1)
+
+    assert work_queue.requeue_expired_leases(jobs) == 1
+    assert jobs.find_one({"_id": stale["_id"]})["state"] == work_queue.RETRY
+
+    job = work_queue.claim_job(jobs, "worker-2")
+    assert job["attempts"] == 2
+    assert not work_queue.complete_job(jobs, stale)
+    assert work_queue.complete_job(jobs, job, result={"version": 1})
+    assert jobs.find_one({"_id": job["_id"]})["state"] == work_queue.DONE
+
+
+def test_unexpired_lease_is_not_requeued(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+    work_queue.claim_job(jobs, "worker-1", lease_seconds=60)
+
+    assert work_queue.requeue_expired_leases(jobs) == 0
+    assert jobs.find_one()["state"] == work_queue.LEASED
+
+
+def test_expired_lease_is_dead_lettered_after_max_attempts(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+    work_queue.claim_job(jobs, "dead-worker", lease_seconds=-1)
+
+    assert work_queue.requeue_expired_leases(jobs, max_attempts=1) == 1
+    job = jobs.find_one()
+    assert job["state"] == work_queue.DEAD
+    assert job["last_error"] == "Lease expired"
+
+
+def test_failed_job_backs_off_exponentially_then_dead_letters(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+
+    for attempt, backoff in [(1, 10), (2, 20)]:
+        job = work_queue.claim_job(jobs, "worker-1")
+        assert job["attempts"] == attempt
+        before = datetime.now(timezone.utc)
+        assert work_queue.fail_job(jobs, job, RuntimeError("boom"), max_attempts=3, backoff_seconds=10) == work_queue.RETRY
+
+        stored = jobs.find_one({"_id": job["_id"]})
+        assert stored["last_error"] == "boom"
+        assert stored["available_at"] >= before + timedelta(seconds=backoff - 1)
+        assert work_queue.claim_job(jobs, "worker-1") is None  # Still backing off
+        make_claimable(jobs, job)
+
+    job = work_queue.claim_job(jobs, "worker-1")
+    assert work_queue.fail_job(jobs, job, RuntimeError("boom"), max_attempts=3, backoff_seconds=10) == work_queue.DEAD
+    make_claimable(jobs, job)
+    assert work_queue.claim_job(jobs, "worker-1") is None
+
+
+def test_enqueue_leaves_leased_job_alone(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+    job = work_queue.claim_job(jobs, "worker-1")
+
+    # The upsert misses the leased job and hits the unique index; that duplicate key is expected
+    assert work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 9), ("golf-extra", "Hotel B", 0)]) == 1
+
+    stored = jobs.find_one({"_id": job["_id"]})
+    assert stored["state"] == work_queue.LEASED
+    assert stored["lease_id"] == job["lease_id"]
+    assert jobs.count_documents({}) == 2
+
+
+def test_enqueue_rearms_finished_job(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0)])
+    job = work_queue.claim_job(jobs, "worker-1")
+    work_queue.complete_job(jobs, job)
+
+    assert work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 3)]) == 1
+    stored = jobs.find_one()
+    assert stored["state"] == work_queue.PENDING
+    assert stored["attempts"] == 0
+    assert stored["priority"] == 3
+
+
+def test_queue_stats_counts_per_site_and_state(jobs):
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Hotel A", 0), ("golf-extra", "Hotel B", 0), ("golf-motion", "Hotel A", 0)])
+    work_queue.claim_job(jobs, "worker-1", sites=["golf-extra"])
+
+    assert work_queue.queue_stats(jobs) == {
+        "golf-extra": {work_queue.PENDING: 1, work_queue.LEASED: 1},
+        "golf-motion": {work_queue.PENDING: 1},
+    }
+
+
+def test_retire_unplanned_leaves_only_the_plan_claimable(jobs):
+    work_queue.enqueue_jobs(jobs, [
+        ("golf-extra", "Running", 9),
+        ("golf-extra", "Planned", 0),
+        ("golf-extra", "Old plan", 0),
+        ("golf-motion", "Other site", 0),
+    ])
+    assert work_queue.claim_job(jobs, "worker-1", sites=["golf-extra"])["hotel_name"] == "Running"
+
+    plan = [("golf-extra", "Planned", 500)]
+    assert work_queue.retire_unplanned(jobs, plan, ["golf-extra"]) == 1
+    work_queue.enqueue_jobs(jobs, plan)
+
+    states = {job["hotel_name"]: job["state"] for job in jobs.find({"site": "golf-extra"})}
+    assert states == {"Running": work_queue.LEASED, "Planned": work_queue.PENDING, "Old plan": work_queue.SKIPPED}
+    assert jobs.find_one({"site": "golf-motion"})["state"] == work_queue.PENDING
+
+    # Enqueueing a skipped job re-arms it
+    work_queue.enqueue_jobs(jobs, [("golf-extra", "Old plan", 0)])
+    assert jobs.find_one({"hotel_name": "Old plan"})["state"] == work_queue.PENDING
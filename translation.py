@@ -0,0 +1,219 @@
+import os
+import re
+import json
+import logging
+from collections import Counter
+from functools import lru_cache
+
+import budgets
+
+# Versioned German -> English glossary for hotel and golf vocabulary
+GLOSSARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "glossary_de_en.json")
+
+# Longest glossary phrase, in words, tried when matching a segment
+MAX_PHRASE_WORDS = 5
+
+# Distinct free-text segments kept from remote translation per process
+REMOTE_CACHE_SIZE = 20000
+
+# Google Translate's mobile page, which returns the translation in plain HTML
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+
+# Segment classes
+EMPTY = "empty"
+NUMERIC = "numeric"  # Prices, dates, counts: passed through untouched
+GLOSSARY = "glossary"  # Fully covered by glossary terms (plus numbers)
+FREE_TEXT = "free_text"  # Sent to the remote translator
+
+# Segments made only of numbers, dates, prices and separators, e.g. "2069,- €" or "16.11.24 – 08.12.24"
+NUMERIC_SEGMENT = re.compile(r"^[\d\s.,:;/+\-–—%*()€$£x]*\d[\d\s.,:;/+\-–—%*()€$£x]*(?:\s*(?:EUR|CHF|Euro))?$", re.IGNORECASE)
+NUMERIC_WORD = re.compile(r"^(?:[\d.,+\-%*€$£]*\d[\d.,+\-%*€$£]*|[€$£x.+*\-]+|EUR|CHF|Euro)$", re.IGNORECASE)
+
+# Words are split on whitespace and these separators, which are kept as they are
+WORD = re.compile(r"[^\s/():;,–—]+")
+
+_glossary = None
+stats = Counter()
+
+
+# Function to load the glossary on first use
+def load_glossary():
+    global _glossary
+    if _glossary is None:
+        with open(GLOSSARY_FILE, "r", encoding="utf-8") as f:
+            _glossary = json.load(f)
+        _glossary["terms"] = {normalize(term): translation for term, translation in _glossary["terms"].items()}
+    return _glossary
+
+
+# Function to normalize a segment for glossary lookups
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+# Function to translate a segment using only the glossary; returns None unless every word is covered
+def glossary_translation(text):
+    terms = load_glossary()["terms"]
+
+    exact = terms.get(normalize(text))
+    if exact is not None:
+        return _match_case(text, exact)
+
+    words = list(WORD.finditer(text))
+    parts = []
+    last_end = 0
+    i = 0
+    while i < len(words):
+        # Longest glossary phrase starting at this word (only across plain whitespace)
+        for n in range(min(MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            span = words[i:i + n]
+            if any(text[a.end():b.start()].strip() for a, b in zip(span, span[1:])):
+                continue
+            translation = terms.get(normalize(" ".join(word.group() for word in span)))
+            if translation is not None:
+                break
+        else:
+            if not NUMERIC_WORD.match(words[i].group()):
+                return None
+            n, translation = 1, words[i].group()
+
+        source = text[words[i].start():words[i + n - 1].end()]
+        if i == 0 or normalize(source) == normalize(translation):
+            translation = _match_case(source, translation)
+        parts.append(text[last_end:words[i].start()])
+        parts.append(translation)
+        last_end = words[i + n - 1].end()
+        i += n
+
+    parts.append(text[last_end:])
+    return "".join(parts)
+
+
+# Function to keep the source casing of terms that are the same in English, otherwise capitalize like the source
+def _match_case(source, translation):
+    if normalize(source) == normalize(translation):
+        return source
+    if source[:1].isupper() and translation[:1].islower():
+        return translation[:1].upper() + translation[1:]
+    return translation
+
+
+# Function to decide how a segment will be translated
+def classify_segment(text):
+    if not text.strip():
+        return EMPTY
+    if NUMERIC_SEGMENT.match(text.strip()):
+        return NUMERIC
+    if glossary_translation(text.strip()) is not None:
+        return GLOSSARY
+    return FREE_TEXT
+
+
+# Function to call the remote translator; failures raise so they are not cached
+@lru_cache(maxsize=REMOTE_CACHE_SIZE)
+def _remote_translate(text):
+    import requests
+    from bs4 import BeautifulSoup
+
+    stats["remote_calls"] += 1
+    # Same endpoint deep_translator's GoogleTranslator uses, but with socket timeouts so a hung call frees its thread
+    timeout = (budgets.configured_timeout("connect"), budgets.configured_timeout("translate"))
+    response = requests.get(GOOGLE_TRANSLATE_URL, params={"sl": "de", "tl": "en", "q": text}, timeout=timeout)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    element = soup.find("div", class_="result-container") or soup.find("div", class_="t0")
+    if element is None:
+        raise ValueError("No translation found in the response")
+    return element.get_text(strip=True)
+
+
+# Function to translate a stripped segment locally; returns (class, translation or None for free text)
+def _local_translation(segment):
+    if NUMERIC_SEGMENT.match(segment):
+        return NUMERIC, segment
+    translation = glossary_translation(segment)
+    if translation is not None:
+        return GLOSSARY, translation
+    return FREE_TEXT, None
+
+
+# Function to send free text to the remote translator, keeping the original text if that fails
+def _translate_remote(segment, text):
+    try:
+        # Translation calls are idempotent, so a slow one may be hedged with a duplicate
+        return budgets.call("translate", _remote_translate, segment)
+    except budgets.BudgetExceeded:
+        raise
+    except Exception as e:
+        logging.warning(f"Translation failed for text: {text[:100]}... | Error: {e}")
+        return text  # Return original text if translation fails
+
+
+# Function to translate text from German to English, only calling the remote translator for free text
+# (use_glossary=False sends everything but numbers to the remote translator, e.g. for proper nouns)
+def translate(text, max_chars=None, use_glossary=True):
+    segment = text.strip()
+    if not segment:  # Skip empty strings
+        stats[EMPTY] += 1
+        return text
+
+    if use_glossary:
+        segment_class, translation = _local_translation(segment)
+    elif NUMERIC_SEGMENT.match(segment):
+        segment_class, translation = NUMERIC, segment
+    else:
+        segment_class, translation = FREE_TEXT, None
+    stats[segment_class] += 1
+    if translation is not None:
+        return translation
+
+    if max_chars:
+        segment = segment[:max_chars]
+    return _translate_remote(segment, text)
+
+
+# Function to translate a multi-line block: glossary and numeric lines locally, each run of free-text lines in one remote call
+def translate_lines(text, max_chars=None):
+    block = text.strip()
+    if max_chars:
+        block = block[:max_chars]  # Cap the whole block, as when it was sent in one piece
+
+    parts = []
+    free_text = []
+
+    def flush():
+        # Trailing blank lines of a run stay outside the remote call
+        blank = 0
+        while free_text and not free_text[-1]:
+            free_text.pop()
+            blank += 1
+        if free_text:
+            run = "\n".join(free_text)
+            parts.append(_translate_remote(run, run))
+            free_text.clear()
+        parts.extend([""] * blank)
+
+    for line in block.split("\n"):
+        line = line.strip()
+        if not line:
+            # Blank lines between free-text paragraphs stay in the same remote call
+            (free_text if free_text else parts).append(line)
+            continue
+        segment_class, translation = _local_translation(line)
+        stats[segment_class] += 1
+        if translation is None:
+            free_text.append(line)
+        else:
+            flush()
+            parts.append(translation)
+    flush()
+    return "\n".join(parts)
+
+
+# Function to format translation counts for run stats log lines
+def translation_summary():
+    return (
+        f"{stats[NUMERIC]} numeric, {stats[GLOSSARY]} glossary, {stats[FREE_TEXT]} free text "
+        f"({stats['remote_calls']} remote calls), glossary version {load_glossary()['version']}"
+    )
@@ -0,0 +1,188 @@
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne, errors
+
+import db
+
+# Job states
+PENDING = "pending"  # Waiting to be claimed
+LEASED = "leased"  # Claimed by a worker until lease_expires_at
+RETRY = "retry"  # Failed, claimable again once available_at has passed
+DONE = "done"  # Finished successfully
+DEAD = "dead"  # Failed max_attempts times, needs a human to look at it
+SKIPPED = "skipped"  # Left out of a recrawl plan; enqueueing it again re-arms it
+
+CLAIMABLE_STATES = [PENDING, RETRY]
+
+# Default queue settings
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 60
+
+
+# Function to connect to the crawl_jobs collection
+def get_jobs_collection():
+    jobs = db.get_collection("crawl_jobs")
+    ensure_indexes(jobs)
+    return jobs
+
+
+# Function to create the indexes the queue relies on
+def ensure_indexes(jobs):
+    # One job per hotel x site
+    jobs.create_index([("site", ASCENDING), ("hotel_name", ASCENDING)], unique=True)
+    # Claim order: highest priority first, then oldest
+    jobs.create_index([("state", ASCENDING), ("priority", DESCENDING), ("available_at", ASCENDING)])
+    # Finding expired leases
+    jobs.create_index([("state", ASCENDING), ("lease_expires_at", ASCENDING)])
+
+
+# Function to add (or re-arm) a job for every hotel x site pair
+def enqueue_hotels(jobs, hotels, sites, priority=0):
+    entries = [(site, hotel_name, priority) for hotel_name in hotels for site in sites]
+    queued = enqueue_jobs(jobs, entries)
+    logging.info(f"Queued {queued} job(s) for {len(hotels)} hotel(s) on site(s): {', '.join(sites)}")
+    return queued
+
+
+# Function to add (or re-arm) jobs from (site, hotel_name, priority) entries
+def enqueue_jobs(jobs, entries):
+    now = datetime.now(timezone.utc)
+    operations = []
+    for site, hotel_name, priority in entries:
+        # Jobs that are currently leased are left alone so a running worker keeps its job
+        operations.append(UpdateOne(
+            {"site": site, "hotel_name": hotel_name, "state": {"$ne": LEASED}},
+            {
+                "$set": {
+                    "state": PENDING,
+                    "priority": priority,
+                    "attempts": 0,
+                    "available_at": now,
+                    "last_error": None,
+                    "updated_at": now,
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        ))
+
+    if not operations:
+        return 0
+
+    try:
+        result = jobs.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+    except errors.BulkWriteError as e:
+        # Duplicate keys come from upserts racing with leased jobs, which is expected
+        other_errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+        if other_errors:
+            raise
+        return e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+
+
+# Function to take claimable jobs on the given sites out of the queue unless they are in the entries
+def retire_unplanned(jobs, entries, sites):
+    now = datetime.now(timezone.utc)
+    retired = 0
+    for site in sites:
+        planned = [hotel_name for entry_site, hotel_name, _ in entries if entry_site == site]
+        result = jobs.update_many(
+            {"site": site, "state": {"$in": CLAIMABLE_STATES}, "hotel_name": {"$nin": planned}},
+            {"$set": {"state": SKIPPED, "updated_at": now}},
+        )
+        retired += result.modified_count
+    return retired
+
+
+# Function to atomically claim the next job with a time-limited lease
+def claim_job(jobs, worker_id, sites=None, lease_seconds=LEASE_SECONDS):
+    now = datetime.now(timezone.utc)
+    query = {"state": {"$in": CLAIMABLE_STATES}, "available_at": {"$lte": now}}
+    if sites:
+        query["site"] = {"$in": list(sites)}
+
+    return jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "state": LEASED,
+                "worker_id": worker_id,
+                "lease_id": uuid.uuid4().hex,
+                "leased_at": now,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", DESCENDING), ("available_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+# Function to mark a leased job as done; returns False if the lease was lost in the meantime
+def complete_job(jobs, job, result=None):
+    now = datetime.now(timezone.utc)
+    update = jobs.update_one(
+        {"_id": job["_id"], "state": LEASED, "lease_id": job["lease_id"]},
+        {
+            "$set": {"state": DONE, "result": result, "finished_at": now, "last_error": None, "updated_at": now},
+            "$unset": {"lease_id": "", "lease_expires_at": ""},
+        },
+    )
+    if update.modified_count == 0:
+        logging.warning(f"Lease lost before completion for {job['site']} / {job['hotel_name']}")
+        return False
+    return True
+
+
+# Function to send a failed job to retry with backoff, or to the dead-letter state
+def fail_job(jobs, job, error, max_attempts=MAX_ATTEMPTS, backoff_seconds=RETRY_BACKOFF_SECONDS):
+    now = datetime.now(timezone.utc)
+    attempts = job.get("attempts", 1)
+    if attempts >= max_attempts:
+        state = DEAD
+        available_at = now
+    else:
+        state = RETRY
+        available_at = now + timedelta(seconds=backoff_seconds * 2 ** (attempts - 1))
+
+    update = jobs.update_one(
+        {"_id": job["_id"], "state": LEASED, "lease_id": job["lease_id"]},
+        {
+            "$set": {"state": state, "available_at": available_at, "last_error": str(error)[:1000], "updated_at": now},
+            "$unset": {"lease_id": "", "lease_expires_at": ""},
+        },
+    )
+    if update.modified_count == 0:
+        logging.warning(f"Lease lost before failure was recorded for {job['site']} / {job['hotel_name']}")
+        return None
+    return state
+
+
+# Function to return jobs whose lease ran out (e.g. the worker died) to the queue
+def requeue_expired_leases(jobs, max_attempts=MAX_ATTEMPTS):
+    now = datetime.now(timezone.utc)
+    expired = {"state": LEASED, "lease_expires_at": {"$lt": now}}
+    unset = {"$unset": {"lease_id": "", "lease_expires_at": ""}}
+
+    dead = jobs.update_many(
+        {**expired, "attempts": {"$gte": max_attempts}},
+        {"$set": {"state": DEAD, "last_error": "Lease expired", "updated_at": now}, **unset},
+    )
+    requeued = jobs.update_many(
+        expired,
+        {"$set": {"state": RETRY, "available_at": now, "last_error": "Lease expired", "updated_at": now}, **unset},
+    )
+    if dead.modified_count or requeued.modified_count:
+        logging.warning(f"Expired leases: {requeued.modified_count} requeued, {dead.modified_count} dead-lettered")
+    return requeued.modified_count + dead.modified_count
+
+
+# Function to count jobs per site and state
+def queue_stats(jobs):
+    stats = {}
+    for row in jobs.aggregate([{"$group": {"_id": {"site": "$site", "state": "$state"}, "count": {"$sum": 1}}}]):
+        stats.setdefault(row["_id"]["site"], {})[row["_id"]["state"]] = row["count"]
+    return stats
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import json
+import socket
+import logging
+import argparse
+
+import budgets
+import translation
+import work_queue
+from memory import peak_rss_mb, peak_rss_summary
+from sites import SITE_SCRIPTS, SiteCrawler
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+# Function to claim and process jobs until stopped (or until the queue is empty with exit_when_empty)
+def run_worker(jobs, sites=None, lease_seconds=work_queue.LEASE_SECONDS, max_attempts=work_queue.MAX_ATTEMPTS,
+               poll_interval=10, exit_when_empty=False):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    crawler = SiteCrawler()
+    processed = 0
+    logging.info(f"Worker {worker_id} started for site(s): {', '.join(sites or SITE_SCRIPTS)}")
+
+    try:
+        while True:
+            work_queue.requeue_expired_leases(jobs, max_attempts=max_attempts)
+            job = work_queue.claim_job(jobs, worker_id, sites=sites, lease_seconds=lease_seconds)
+            if job is None:
+                if exit_when_empty:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logging.info(f"Claimed {job['site']} / {job['hotel_name']} (attempt {job['attempts']})")
+            try:
+                # Out-of-budget hotels fail into the retry state and get the larger retry budget after the backoff
+                with budgets.hotel_budget(budgets.budget_seconds(retry=job["attempts"] > 1)):
+                    version = crawler.crawl(job["site"], job["hotel_name"])
+                work_queue.complete_job(jobs, job, result={"version": version, "peak_rss_mb": peak_rss_mb()})
+            except Exception as e:
+                state = work_queue.fail_job(jobs, job, e, max_attempts=max_attempts)
+                logging.error(f"Job {job['site']} / {job['hotel_name']} failed ({state}): {e}")
+            processed += 1
+    except KeyboardInterrupt:
+        logging.info("Worker interrupted, unfinished lease will expire and be requeued.")
+    finally:
+        crawler.close()
+
+    logging.info(f"Worker {worker_id} stopped after {processed} job(s), peak RSS: {peak_rss_summary()}")
+    logging.info(f"Translation: {translation.translation_summary()}")
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed crawl worker backed by MongoDB")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Queue a job for every hotel x site")
+    enqueue_parser.add_argument("json_file", nargs="?", default="hotels.json")
+    enqueue_parser.add_argument("--site", action="append", choices=list(SITE_SCRIPTS))
+    enqueue_parser.add_argument("--priority", type=int, default=0)
+
+    run_parser = subparsers.add_parser("run", help="Claim and crawl jobs")
+    run_parser.add_argument("--site", action="append", choices=list(SITE_SCRIPTS))
+    run_parser.add_argument("--lease-seconds", type=int, default=work_queue.LEASE_SECONDS)
+    run_parser.add_argument("--max-attempts", type=int, default=work_queue.MAX_ATTEMPTS)
+    run_parser.add_argument("--poll-interval", type=float, default=10)
+    run_parser.add_argument("--exit-when-empty", action="store_true")
+
+    subparsers.add_parser("stats", help="Show job counts per site and state")
+
+    args = parser.parse_args(argv)
+    jobs = work_queue.get_jobs_collection()
+
+    if args.command == "enqueue":
+        with open(args.json_file, "r", encoding="utf-8") as f:
+            hotels = json.load(f)
+        work_queue.enqueue_hotels(jobs, hotels, args.site or list(SITE_SCRIPTS), priority=args.priority)
+    elif args.command == "run":
+        run_worker(jobs, sites=args.site, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+                   poll_interval=args.poll_interval, exit_when_empty=args.exit_when_empty)
+    elif args.command == "stats":
+        print(json.dumps(work_queue.queue_stats(jobs), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())